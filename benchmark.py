@@ -0,0 +1,462 @@
+"""Benchmarks for the Space Shooter simulation hot paths.
+
+Run with:
+    python benchmark.py collisions
+    python benchmark.py particles
+    python benchmark.py timers
+    python benchmark.py swarm
+    python benchmark.py scenarios --out results.json
+    python benchmark.py compare baseline.json results.json
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import argparse
+import platform
+import tracemalloc
+
+# Benchmarks never need a real window or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import space_shooter_final as game
+
+game.startup(headless=True)
+levels = game.LevelTable()
+
+
+def time_call(func, repeat):
+    """Return the best wall time of `repeat` calls to func, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_collision_scene(bullet_count, target_count, rng):
+    """Scatter bullets and asteroid-sized targets over the playfield"""
+    bullets = game.BulletStore()
+    for _ in range(bullet_count):
+        bullets.spawn(rng.randint(0, game.SCREEN_WIDTH - game.BULLET_WIDTH),
+                      rng.randint(0, game.SCREEN_HEIGHT - game.BULLET_HEIGHT))
+    targets = game.AsteroidStore(levels)
+    for _ in range(target_count):
+        targets.spawn(rng.randint(0, game.SCREEN_WIDTH - game.ASTEROID_WIDTH),
+                      rng.randint(0, game.SCREEN_HEIGHT - game.ASTEROID_HEIGHT))
+    return bullets, targets
+
+
+def naive_collisions(bullets, targets):
+    """The original nested-loop pass over Rects: first hit per bullet, hits are removed"""
+    bullet_rects = [pygame.Rect(box) for box in zip(*(column.tolist() for column in bullets.boxes()))]
+    target_rects = list(enumerate(pygame.Rect(box) for box in zip(*(column.tolist() for column in targets.boxes()))))
+    hits = []
+    for bullet_row, bullet_rect in enumerate(bullet_rects):
+        for target in target_rects:
+            if bullet_rect.colliderect(target[1]):
+                target_rects.remove(target)
+                hits.append((bullet_row, target[0]))
+                break
+    return hits
+
+
+def kernel_collisions(bullets, targets):
+    """The same pass as one array operation over the entity stores"""
+    bullet_rows, target_rows = game.aabb_first_hits(bullets.boxes(), targets.boxes())
+    return list(zip(bullet_rows.tolist(), target_rows.tolist()))
+
+
+def make_clustered_scene(rng):
+    """A small random scene packed into a corner so many bullets fight over the same targets"""
+    bullets = game.BulletStore()
+    targets = game.AsteroidStore(levels)
+    span = rng.choice([20, 60, 200])
+    for _ in range(rng.randint(0, 40)):
+        bullets.spawn(rng.randint(0, span), rng.randint(0, span))
+    for _ in range(rng.randint(0, 40)):
+        targets.spawn(rng.randint(0, span), rng.randint(0, span))
+    return bullets, targets
+
+
+def check_collisions(trials, rng):
+    """Compare the kernel against the nested loop on random dense scenes"""
+    for trial in range(trials):
+        bullets, targets = make_clustered_scene(rng)
+        if naive_collisions(bullets, targets) != kernel_collisions(bullets, targets):
+            sys.exit(f"Collision results differ in clustered trial {trial}")
+    print(f"Kernel matches the nested loop in {trials} clustered scenes")
+
+
+def bench_collisions(args):
+    """Compare the nested-loop and array collision passes as entity counts grow"""
+    rng = random.Random(args.seed)
+    check_collisions(args.trials, rng)
+    print(f"{'bullets':>8} {'targets':>8} {'naive ms':>10} {'array ms':>10} {'speedup':>8}")
+    for count in args.counts:
+        bullets, targets = make_collision_scene(count, count, rng)
+        kernel_time = time_call(lambda: kernel_collisions(bullets, targets), args.repeat)
+        if count > args.naive_max:
+            # The nested loop takes minutes here; only the kernel is timed
+            print(f"{count:>8} {count:>8} {'-':>10} {kernel_time * 1000:>10.3f} {'-':>8}")
+            continue
+        if naive_collisions(bullets, targets) != kernel_collisions(bullets, targets):
+            sys.exit(f"Collision results differ at {count} entities")
+        naive_time = time_call(lambda: naive_collisions(bullets, targets), args.repeat)
+        print(f"{count:>8} {count:>8} {naive_time * 1000:>10.3f} {kernel_time * 1000:>10.3f} "
+              f"{naive_time / kernel_time:>7.1f}x")
+
+
+def bench_particles(args):
+    """Time one particle frame (update + draw) at increasing live particle counts"""
+    screen = pygame.Surface((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+    rng = random.Random(args.seed)
+    print(f"{'particles':>10} {'update ms':>10} {'draw ms':>10} {'frame ms':>10} {'budget':>8}")
+    for count in args.counts:
+        system = game.ParticleSystem(capacity=max(count, 1), seed=args.seed)
+
+        def refill():
+            system.clear()
+            while len(system) < count:
+                system.emit(rng.randint(0, game.SCREEN_WIDTH), rng.randint(0, game.SCREEN_HEIGHT),
+                            min(15, count - len(system)))
+
+        update_time = float('inf')
+        for _ in range(args.repeat):
+            refill()
+            update_time = min(update_time, time_call(system.update, 1))
+        draw_time = time_call(lambda: system.draw(screen), args.repeat)
+        frame_time = update_time + draw_time
+        print(f"{count:>10} {update_time * 1000:>10.3f} {draw_time * 1000:>10.3f} {frame_time * 1000:>10.3f} "
+              f"{frame_time * game.FPS * 100:>7.0f}%")
+
+
+def check_timers(steps, rng):
+    """Check that every timer fires exactly on its expiry tick (and cancelled ones never do) against a heap"""
+    wheel = game.TimerWheel(slots=8, levels=3)  # A small wheel so every level cascades and wraps
+    reference = []
+    handles = {}
+    fired = []
+    for step in range(steps):
+        for _ in range(rng.randint(0, 3)):
+            delay = rng.choice([1, 7, 8, 9, 63, 64, 65, 511, 512, 513, rng.randint(1, 2000)])
+            timer_id = len(handles)
+            handles[timer_id] = wheel.schedule(delay, fired.append, timer_id)
+            heapq.heappush(reference, (wheel.tick + delay, timer_id))
+        if handles and rng.random() < 0.2:
+            wheel.cancel(handles.pop(rng.randrange(len(handles)), None))
+        wheel.advance()
+        due = []
+        while reference and reference[0][0] == wheel.tick:
+            timer_id = heapq.heappop(reference)[1]
+            if timer_id in handles:
+                due.append(timer_id)
+        if sorted(fired) != due:
+            sys.exit(f"Timer wheel fired {sorted(fired)} at tick {wheel.tick}, expected {due}")
+        fired.clear()
+    print(f"Timer wheel matches a heap reference over {steps} ticks")
+
+
+def bench_timers(args):
+    """Per-tick cost of per-entity countdowns vs the timer wheel as pending timers grow"""
+    rng = random.Random(args.seed)
+    check_timers(args.steps, rng)
+    print(f"{'timers':>8} {'countdown us':>13} {'wheel us':>10}")
+    for count in args.counts:
+        # Countdowns: every timer is decremented every tick
+        countdowns = [rng.randint(1, game.ENEMY_SHOOT_COOLDOWN) for _ in range(count)]
+
+        def tick_countdowns():
+            for _ in range(game.ENEMY_SHOOT_COOLDOWN):
+                for i in range(count):
+                    countdowns[i] -= 1
+                    if countdowns[i] <= 0:
+                        countdowns[i] = game.ENEMY_SHOOT_COOLDOWN
+
+        # Wheel: each tick only touches the timers expiring on it
+        wheel = game.TimerWheel()
+
+        def rearm(delay=game.ENEMY_SHOOT_COOLDOWN):
+            wheel.schedule(delay, rearm)
+        for _ in range(count):
+            rearm(rng.randint(1, game.ENEMY_SHOOT_COOLDOWN))
+
+        def tick_wheel():
+            for _ in range(game.ENEMY_SHOOT_COOLDOWN):
+                wheel.advance()
+
+        countdown_time = time_call(tick_countdowns, args.repeat) / game.ENEMY_SHOOT_COOLDOWN
+        wheel_time = time_call(tick_wheel, args.repeat) / game.ENEMY_SHOOT_COOLDOWN
+        print(f"{count:>8} {countdown_time * 1e6:>13.1f} {wheel_time * 1e6:>10.1f}")
+
+
+def brute_neighbor_pairs(x, y, radius):
+    """Every close pair from the full distance matrix"""
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    close = dx * dx + dy * dy < radius * radius
+    np.fill_diagonal(close, False)
+    return np.nonzero(close)
+
+
+def check_swarm_neighbors(trials, rng):
+    """Compare the grid's neighbor pairs against the full distance matrix on random clustered swarms"""
+    for trial in range(trials):
+        count = rng.randint(0, 300)
+        spread = rng.choice([20, 100, game.SCREEN_WIDTH])
+        center_x, center_y = rng.uniform(-200, game.SCREEN_WIDTH), rng.uniform(-200, game.SCREEN_HEIGHT)
+        x = np.array([center_x + rng.uniform(-spread, spread) for _ in range(count)])
+        y = np.array([center_y + rng.uniform(-spread, spread) for _ in range(count)])
+        grid = sorted(zip(*(a.tolist() for a in game.grid_neighbor_pairs(x, y, game.SWARM_NEIGHBOR_RADIUS))))
+        brute = sorted(zip(*(a.tolist() for a in brute_neighbor_pairs(x, y, game.SWARM_NEIGHBOR_RADIUS))))
+        if grid != brute:
+            sys.exit(f"Neighbor pairs differ in swarm trial {trial}")
+    print(f"Neighbor grid matches the distance matrix in {trials} random swarms")
+
+
+def fill_swarm(ships, count, rng, level):
+    """Spawn squads over the top two thirds of the screen until the swarm has `count` ships"""
+    while len(ships) < count:
+        ships.spawn(rng.uniform(0, game.SCREEN_WIDTH - game.ENEMY_SHIP_WIDTH),
+                    rng.uniform(0, game.SCREEN_HEIGHT * 2 // 3), level)
+
+
+def bench_swarm(args):
+    """Per-tick cost of swarm steering, and of its neighbor search against the full distance matrix"""
+    rng = random.Random(args.seed)
+    check_swarm_neighbors(args.trials, rng)
+    print(f"{'ships':>8} {'pairs':>8} {'matrix ms':>10} {'grid ms':>10} {'update ms':>10} {'budget':>8}")
+    for count in args.counts:
+        wheel = game.TimerWheel()
+        ships = game.SwarmShipStore(wheel, levels)
+        fill_swarm(ships, count, rng, levels.max_level)
+        for _ in range(60):  # Let the squads settle into formation
+            ships.update()
+            wheel.advance()
+        n = ships.count
+        x, y = ships.x[:n].copy(), ships.y[:n].copy()
+        pairs = len(game.grid_neighbor_pairs(x, y, game.SWARM_NEIGHBOR_RADIUS)[0])
+        matrix_time = time_call(lambda: brute_neighbor_pairs(x, y, game.SWARM_NEIGHBOR_RADIUS), args.repeat)
+        grid_time = time_call(lambda: game.grid_neighbor_pairs(x, y, game.SWARM_NEIGHBOR_RADIUS), args.repeat)
+        update_time = time_call(ships.update, args.repeat)
+        print(f"{n:>8} {pairs:>8} {matrix_time * 1000:>10.3f} {grid_time * 1000:>10.3f} "
+              f"{update_time * 1000:>10.3f} {update_time * game.FPS * 100:>7.0f}%")
+
+
+def make_invulnerable(session):
+    """Shrink the player's hitbox to nothing so a scenario keeps running instead of ending in game over"""
+    session.player.rect.size = (0, 0)
+
+
+def setup_max_level(session, rng):
+    """Jump straight to the last level, where spawning is fastest"""
+    make_invulnerable(session)
+    session.score = session.levels.thresholds[-1]
+    session.check_level_up()
+
+
+def drive_rapid_fire(session, rng):
+    """Fire a bullet every tick while sweeping back and forth across the screen"""
+    session.held_keys = {pygame.K_LEFT} if (session.profiler.frame // 120) % 2 else {pygame.K_RIGHT}
+    session.player.cooling_down = False  # Skip the shot cooldown so every tick really fires
+    session.fire_bullet()
+
+
+def drive_particle_storm(session, rng):
+    """Keep about 2,000 explosion particles alive"""
+    while len(session.particles) < 2000:
+        session.particles.emit(rng.randint(0, game.SCREEN_WIDTH), rng.randint(0, game.SCREEN_HEIGHT), 15)
+
+
+def drive_enemy_barrage(session, rng):
+    """Keep 40 top-level enemy ships on screen, all firing as fast as they can"""
+    while len(session.enemy_ships) < 40:
+        session.enemy_ships.spawn(rng.randint(0, game.SCREEN_WIDTH - game.ENEMY_SHIP_WIDTH),
+                                  rng.randint(0, game.SCREEN_HEIGHT // 3), session.levels.max_level)
+
+
+def setup_swarm(session, rng):
+    """Switch the session to swarm AI"""
+    make_invulnerable(session)
+    session.enemy_ships = game.SwarmShipStore(session.timers, session.levels)
+
+
+def drive_swarm(session, rng):
+    """Keep 500 first-level swarm ships in formation on screen, all leading their shots at the player"""
+    fill_swarm(session.enemy_ships, 500, rng, 1)  # At the top level every ship would fire every tick
+
+
+# Scenario name -> (setup before the first tick, driver called before every tick)
+SCENARIOS = {
+    'idle': (lambda session, rng: make_invulnerable(session), None),
+    'max_level': (setup_max_level, None),
+    'rapid_fire': (lambda session, rng: make_invulnerable(session), drive_rapid_fire),
+    'particle_storm': (lambda session, rng: make_invulnerable(session), drive_particle_storm),
+    'enemy_barrage': (lambda session, rng: make_invulnerable(session), drive_enemy_barrage),
+    'swarm': (setup_swarm, drive_swarm),
+}
+
+
+def run_scenario(name, ticks, warmup, seed):
+    """Run one scenario through Game.update and Game.draw; return its phase timings, allocations and entity peaks"""
+    setup, drive = SCENARIOS[name]
+    rng = random.Random(seed)
+    session = game.Game(headless=True, seed=seed)
+    setup(session, rng)
+
+    def step():
+        session.profiler.begin_frame()
+        if drive:
+            drive(session, rng)
+        session.profiler.lap('scenario')
+        session.update()
+        session.draw()
+        session.profiler.end_frame(session.entity_counts())
+
+    # Warm caches and pools, then time a fresh window of ticks
+    for _ in range(warmup):
+        step()
+    session.profiler = game.FrameProfiler(history=ticks)
+    for _ in range(ticks):
+        step()
+    phases = session.profiler.percentiles()
+    peaks = {kind: int(buffer.max()) for kind, buffer in session.profiler.counts.items()}
+
+    # A second, traced pass measures allocations (tracemalloc slows everything down, so it is not timed)
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    for _ in range(ticks):
+        step()
+    end_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'phases': phases,
+        'alloc_peak_kb': (peak_size - start_size) / 1024,
+        'alloc_net_kb': (end_size - start_size) / 1024,
+        'peak_counts': peaks,
+    }
+
+
+def bench_scenarios(args):
+    """Run the scripted gameplay scenarios and optionally save the results as JSON"""
+    names = args.only or list(SCENARIOS)
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': game.np.__version__,
+            'seed': args.seed,
+            'ticks': args.ticks,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        result = results['scenarios'][name] = run_scenario(name, args.ticks, args.warmup, args.seed)
+        frame = result['phases']['frame']
+        print(f"\n{name}: frame p50 {frame['p50']:.3f} ms, p99 {frame['p99']:.3f} ms | "
+              f"alloc peak {result['alloc_peak_kb']:.0f} KB, net {result['alloc_net_kb']:+.0f} KB | peaks "
+              + ", ".join(f"{kind} {count}" for kind, count in result['peak_counts'].items()))
+        print(f"  {'phase':<34} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} ms")
+        for phase, stats in sorted(result['phases'].items()):
+            print(f"  {phase:<34} {stats['p50']:7.3f} {stats['p95']:7.3f} {stats['p99']:7.3f} {stats['max']:7.3f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+def bench_compare(args):
+    """Flag phases whose timings or allocations regressed against a baseline results file"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)['scenarios']
+    with open(args.current) as f:
+        current = json.load(f)['scenarios']
+
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        for phase in sorted(baseline[name]['phases'].keys() & current[name]['phases'].keys()):
+            for stat in ('p50', 'p95'):
+                before = baseline[name]['phases'][phase][stat]
+                after = current[name]['phases'][phase][stat]
+                # Ignore sub-noise differences on tiny phases
+                if after > before * (1 + args.threshold) and after - before > args.min_ms:
+                    regressions.append(f"{name} {phase} {stat}: {before:.3f} -> {after:.3f} ms "
+                                       f"({after / before - 1 if before else float('inf'):+.0%})")
+        before = baseline[name]['alloc_peak_kb']
+        after = current[name]['alloc_peak_kb']
+        if after > before * (1 + args.threshold) and after - before > args.min_kb:
+            regressions.append(f"{name} alloc peak: {before:.0f} -> {after:.0f} KB")
+
+    for name in sorted(baseline.keys() ^ current.keys()):
+        print(f"Scenario {name} is only in {'the baseline' if name in baseline else 'the current results'}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Space Shooter benchmarks")
+    parser.add_argument('--seed', type=int, default=1234, help="random seed for generated scenes")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (best is reported)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    collisions = subparsers.add_parser('collisions', help="bullet-vs-target collision pass scaling")
+    collisions.add_argument('--counts', type=int, nargs='+', default=[10, 100, 500, 1000, 2000, 5000, 10000],
+                            help="entity counts to measure (same number of bullets and targets)")
+    collisions.add_argument('--naive-max', type=int, default=2000,
+                            help="largest count to time and check against the nested loop")
+    collisions.add_argument('--trials', type=int, default=500,
+                            help="random clustered scenes to check against the nested loop")
+    collisions.set_defaults(func=bench_collisions)
+
+    particles = subparsers.add_parser('particles', help="particle system update and draw cost")
+    particles.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 5000, 10000, 25000, 50000],
+                           help="live particle counts to measure")
+    particles.set_defaults(func=bench_particles)
+
+    timers = subparsers.add_parser('timers', help="per-entity countdowns vs the timer wheel")
+    timers.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help="pending timers to measure (each rearms every enemy shot cooldown)")
+    timers.add_argument('--steps', type=int, default=20000,
+                        help="ticks of random scheduling to check against the heap reference")
+    timers.set_defaults(func=bench_timers)
+
+    swarm = subparsers.add_parser('swarm', help="swarm steering and neighbor-grid scaling")
+    swarm.add_argument('--counts', type=int, nargs='+', default=[100, 500, 1000, 2000],
+                       help="swarm sizes to measure (rounded up to whole squads)")
+    swarm.add_argument('--trials', type=int, default=300,
+                       help="random swarms to check against the full distance matrix")
+    swarm.set_defaults(func=bench_swarm)
+
+    scenarios = subparsers.add_parser('scenarios', help="scripted gameplay through Game.update and Game.draw")
+    scenarios.add_argument('--ticks', type=int, default=600, help="measured ticks per scenario")
+    scenarios.add_argument('--warmup', type=int, default=120, help="untimed ticks before measuring")
+    scenarios.add_argument('--only', nargs='+', choices=list(SCENARIOS), help="run only these scenarios")
+    scenarios.add_argument('--out', metavar='FILE', help="write the results to FILE as JSON")
+    scenarios.set_defaults(func=bench_scenarios)
+
+    compare = subparsers.add_parser('compare', help="flag regressions between two scenario result files")
+    compare.add_argument('baseline', help="results JSON to compare against")
+    compare.add_argument('current', help="new results JSON")
+    compare.add_argument('--threshold', type=float, default=0.15, help="allowed slowdown fraction")
+    compare.add_argument('--min-ms', type=float, default=0.05, help="ignore timing changes smaller than this")
+    compare.add_argument('--min-kb', type=float, default=64, help="ignore allocation changes smaller than this")
+    compare.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
+import time
+MODULE_LOAD_START = time.perf_counter()  # Startup timing includes importing pygame and NumPy
 import pygame
 import random
 import sys
+import os
 import math
-
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+import argparse
+import bisect
+import hashlib
+import json
+import queue
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import accumulate
+import numpy as np
 
 # Game constants
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 60  # Simulation ticks per second - all durations and speeds below are per tick
+TICK_TIME = 1.0 / FPS
+MAX_RENDER_FPS = 144  # Rendering runs at the display's rate up to this cap
+MAX_FRAME_TIME = 0.25  # Longer frames (window drags, breakpoints) are clamped to this many seconds
+MAX_CATCH_UP_TICKS = 5  # Simulation ticks allowed per rendered frame before dropping time
 
 # Colors (RGB values)
 BLACK = (0, 0, 0)
@@ -36,323 +51,1851 @@ BULLET_SPEED = 7
 # Asteroid settings
 ASTEROID_WIDTH = 40
 ASTEROID_HEIGHT = 40
-ASTEROID_BASE_MIN_SPEED = 2
-ASTEROID_BASE_MAX_SPEED = 5
-ASTEROID_BASE_SPAWN_RATE = 30  # Lower = more frequent spawning
 
-# Level system settings
-POINTS_PER_LEVEL = 100  # Points needed to advance to next level
-MAX_LEVEL = 10  # Maximum difficulty level
+# Level system settings - per-level difficulty comes from the wave definitions in LEVELS_PATH
+LEVELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels.json')
+LEVEL_UP_BANNER_TICKS = 120  # Show the level up message for 2 seconds at 60 FPS
 
 # Power-up settings
-POWERUP_SPAWN_CHANCE = 0.005  # Chance per frame to spawn a power-up (0.5%)
+POWERUP_SPAWN_CHANCE = 0.005  # Per-tick spawn chance; waits between spawns follow the matching geometric distribution
 POWERUP_FALL_SPEED = 3
 POWERUP_WIDTH = 30
 POWERUP_HEIGHT = 30
 SHIELD_DURATION = 300  # 5 seconds at 60 FPS
 RAPID_FIRE_DURATION = 300  # 5 seconds at 60 FPS
 RAPID_FIRE_COOLDOWN = 5  # Frames between shots during rapid fire
+SHOOT_COOLDOWN = 15  # Frames between normal shots
+# Power-up types: name -> (spawn weight, effect duration in ticks, color). Picking up an effect the
+# player already has adds another stack with its own expiry; each shield stack absorbs one hit.
+POWERUP_TYPES = {
+    'shield': (1, SHIELD_DURATION, BLUE),
+    'rapid_fire': (1, RAPID_FIRE_DURATION, RED),
+}
 
 # Enemy ship settings
 ENEMY_SHIP_WIDTH = 35
 ENEMY_SHIP_HEIGHT = 30
-ENEMY_SHIP_SPEED = 2
-ENEMY_SHIP_SPAWN_CHANCE = 0.008  # Chance per frame to spawn enemy ship
 ENEMY_BULLET_SPEED = 4
-ENEMY_SHOOT_COOLDOWN = 90  # Frames between enemy shots
+ENEMY_SHOOT_COOLDOWN = 90  # Upper bound of a new ship's delay before its first shot
+ENEMY_TURN_INTERVAL = 61  # Ticks between enemy direction changes (about a second)
+
+# Swarm AI settings (--swarm): squads fly in formation, flock with their neighbors and lead their shots
+SWARM_FORMATION = ((0, 0), (-45, -35), (45, -35), (-90, -70), (90, -70))  # V of slots around the squad's lead
+SWARM_NEIGHBOR_RADIUS = 60  # Flocking neighborhood, and the neighbor grid's cell size
+SWARM_SEPARATION_RADIUS = 40  # Ships closer than this push apart
+SWARM_FORMATION_WEIGHT = 0.02  # Pull towards the ship's formation slot, per pixel of distance
+SWARM_SEPARATION_WEIGHT = 8.0
+SWARM_ALIGNMENT_WEIGHT = 0.05
+SWARM_COHESION_WEIGHT = 0.004
+SWARM_MAX_FORCE = 0.3  # Largest change in velocity per tick
+SWARM_SPEED_FACTOR = 2.0  # Top speed relative to the level's enemy speed
+SWARM_DESCENT_FACTOR = 0.5  # Formation slots sweep down at this fraction of the level's enemy speed
+SWARM_SWAY = 120  # Side-to-side sway of each squad's formation, in pixels
+SWARM_SWAY_RATE = 0.02  # Radians per tick
+
+# Particle settings
+PARTICLE_CAPACITY = 65536  # Maximum live particles (extra sparks are dropped)
+PARTICLE_LIFE = 30  # Frames a spark lives
+PARTICLE_MAX_SPEED = 3
+PARTICLE_GRAVITY = 0.1
+PARTICLE_MAX_RADIUS = 3
+
+# Star field settings - parallax layers from far to near
+# (star count, scroll speed in pixels per frame, color, drawn as a single pixel or a small plus)
+STAR_LAYERS = (
+    (1500, 0.25, (80, 80, 80), False),
+    (600, 0.5, (160, 160, 160), False),
+    (150, 1.0, WHITE, True),
+)
+
+# Sprite cache settings
+SPRITE_CACHE_SIZE = 512  # Maximum pre-rendered sprites kept (least recently used are evicted)
+SPRITE_PADDING = 6  # Margin around an entity's box for glows, outlines and pulsing
+SPRITE_ROTATION_STEP = 5  # Degrees per cached asteroid rotation
+
+# HUD settings
+TEXT_CACHE_SIZE = 256  # Maximum rendered text surfaces kept
+
+# Entity store settings
+ENTITY_STORE_CAPACITY = 64  # Initial rows per entity kind; stores double when full
+AABB_QUERY_CHUNK = 1024  # Queries per batch in the collision kernel, bounding its temporary arrays
+
+# Timer wheel settings
+TIMER_WHEEL_SLOTS = 64  # Slots per wheel level (a power of two)
+TIMER_WHEEL_LEVELS = 4  # Levels of wheels: 64 ** 4 ticks (about 77 hours at 60 Hz) of range
 
 # Audio settings
 ENABLE_AUDIO = True  # Set to False to disable audio
+AUDIO_SAMPLE_RATE = 22050
+AUDIO_CACHE_DIR = os.environ.get("SPACE_SHOOTER_CACHE",
+                                 os.path.join(os.path.expanduser("~"), ".cache", "space_shooter"))
+AUDIO_CACHE_VERSION = 1  # Bump when a synthesis function changes so stale buffers are ignored
+AUDIO_CHANNELS = 16  # Mixer channels: channel 0 is reserved for music, the rest are a pool of effect voices
+AUDIO_RATE_LIMIT = 0.05  # Seconds before the same sound may start another voice
+
+# Streaming music settings
+MUSIC_NOTES = (261.63, 293.66, 329.63, 349.23)  # C, D, E, F
+MUSIC_NOTE_SECONDS = 1.0  # Note length at level 1
+MUSIC_TEMPO_STEP = 0.12  # Extra tempo per level above 1
+MUSIC_AMPLITUDE = 3000
+MUSIC_VOLUME = 0.2
+MUSIC_BLOCK_FRAMES = 4096  # Samples per streamed block (about 0.19s at 22050 Hz)
+MUSIC_QUEUE_BLOCKS = 4  # Blocks synthesized ahead; bounds both memory and how late a level change is heard
+
+# Sound cues: name -> (sound, volume, priority). Higher priorities steal voices from lower ones.
+SOUND_CUES = {
+    'shoot': ('shoot', 0.4, 1),
+    'asteroid_explosion': ('explosion', 0.6, 2),
+    'enemy_explosion': ('explosion', 0.7, 2),
+    'pickup': ('pickup', 0.5, 2),
+    'level_up': ('explosion', 0.3, 3),
+    'game_over': ('explosion', 1.0, 4),
+}
+
+# Rendering settings
+DIRTY_TILE_SIZE = 32  # Dirty regions are tracked and merged on a grid of tiles this size
+DIRTY_RECT_MAX_FRACTION = 0.5  # Above this fraction of the screen dirty, a full flip is cheaper
+
+# Profiler settings
+PROFILER_HISTORY = 600  # Frames of timings kept in the ring buffers (10 seconds at 60 FPS)
+PROFILER_OVERLAY_REFRESH = 15  # Frames between overlay text refreshes
+PROFILER_TOGGLE_KEY = pygame.K_F3
+FRAME_BUDGET_MS = 1000 / FPS
+
+# Input settings
+MOVE_LEFT_KEYS = (pygame.K_LEFT, pygame.K_a)
+MOVE_RIGHT_KEYS = (pygame.K_RIGHT, pygame.K_d)
+FIRE_KEYS = (pygame.K_SPACE, pygame.K_s)  # Fire on press, then keep firing while held
+# Event type -> action; every other event type is filtered out by SDL before it is queued
+EVENT_BINDINGS = {
+    pygame.QUIT: 'quit',
+    pygame.KEYDOWN: 'key',
+    pygame.VIDEOEXPOSE: 'repaint',
+    pygame.WINDOWEXPOSED: 'repaint',
+}
+# Key -> action for key presses. Movement keys are read from the held key state each tick
+# and are only bound here so their latency is measured.
+KEY_BINDINGS = {
+    **{key: 'fire' for key in FIRE_KEYS},
+    pygame.K_r: 'restart',
+    pygame.K_m: 'toggle_music',
+    PROFILER_TOGGLE_KEY: 'toggle_profiler',
+    **{key: 'move' for key in MOVE_LEFT_KEYS + MOVE_RIGHT_KEYS},
+}
+INPUT_LATENCY_HISTORY = 1000  # Most recent inputs kept for latency percentiles
 
-def create_audio_effects():
-    """Create audio effects using numpy arrays if available"""
-    sounds = {}
+# Headless simulation settings
+HEADLESS_DEFAULT_FRAMES = 60 * 60 * 10  # 10 minutes of game time at 60 FPS
+
+# Replay file settings
+REPLAY_MAGIC = b'SSRP'
+REPLAY_VERSION = 5  # Bumped whenever seeded simulation changes, so old recordings are rejected, not diverged
+# magic, version, seed, ticks, trajectory points, mode flags, levels file digest
+REPLAY_HEADER = struct.Struct('<4sHQIIB8s')
+REPLAY_FLAG_SWARM = 0x01  # Recorded with --swarm
+REPLAY_POINT = struct.Struct('<III')  # tick, score, level (levels files can go far past 255)
+REPLAY_KEY_LEFT = 0x01  # Bits of the per-tick input byte
+REPLAY_KEY_RIGHT = 0x02
+REPLAY_KEY_FIRE = 0x04
+REPLAY_HAS_ACTIONS = 0x80  # An action count and that many action bytes follow
+REPLAY_ACTION_FIRE = 1
+REPLAY_ACTION_RESTART = 2
+
+class StartupTimer:
+    """Wall-clock breakdown of startup phases, from module import to the first frame on screen"""
+    def __init__(self, start=MODULE_LOAD_START):
+        self.start = self.last = start
+        self.phases = []
+    
+    def lap(self, name):
+        """Charge the time since the previous lap to the named phase"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+    
+    def report(self):
+        """Print the breakdown"""
+        print(f"Startup: {(self.last - self.start) * 1000:.0f} ms to first frame (" +
+              ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in self.phases) + ")")
+
+def startup(headless=False, audio=ENABLE_AUDIO, timer=None):
+    """Bring up only the pygame subsystems this run needs; importing the module initializes nothing"""
+    lap = timer.lap if timer else (lambda name: None)
+    if not headless:
+        pygame.display.init()
+        lap('init.display')
+    pygame.font.init()
+    lap('init.font')
+    if audio and not headless:
+        try:
+            pygame.mixer.init(frequency=AUDIO_SAMPLE_RATE, size=-16, channels=2, buffer=512)
+        except pygame.error as e:
+            print(f"Audio device unavailable - audio disabled ({e})")
+        lap('init.mixer')
+
+def to_stereo(wave, amplitude):
+    """Scale a -1..1 float wave to 16-bit and duplicate it into two channels"""
+    data = (wave * amplitude).astype(np.int16)
+    return np.column_stack((data, data))
+
+def synth_explosion(sample_rate, duration, amplitude, seed):
+    """Create explosion sound (noise burst)"""
+    frames = int(duration * sample_rate)
     
+    # Generate explosion noise (seeded so the cached buffer is reproducible)
+    explosion_data = np.random.default_rng(seed).uniform(-1, 1, frames)
+    # Apply fade out envelope
+    fade_out = np.linspace(1, 0, frames)
+    explosion_data *= fade_out
+    return to_stereo(explosion_data, amplitude)
+
+def synth_shoot(sample_rate, duration, amplitude):
+    """Create shooting sound (quick beep)"""
+    shoot_frames = int(duration * sample_rate)
+    t = np.linspace(0, duration, shoot_frames)
+    
+    # Create a quick rising tone
+    frequency = 800 + t * 2000  # Rising frequency
+    envelope = np.linspace(1, 0, shoot_frames)  # Fade out
+    shoot_wave = envelope * np.sin(2 * np.pi * frequency * t)
+    return to_stereo(shoot_wave, amplitude)
+
+def synth_music_note(sample_rate, freq, duration, harmonics, amplitude):
+    """Create one background music note: the fundamental plus decaying harmonics, faded in and out"""
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    weights = 1.0 / np.arange(1, harmonics + 1)
+    weights /= weights.sum()
+    note_wave = sum(weight * np.sin(2 * np.pi * freq * (k + 1) * t) for k, weight in enumerate(weights))
+    
+    # Apply envelope
+    envelope = np.ones_like(t)
+    fade_samples = len(t) // 10
+    if fade_samples > 0:
+        envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
+        envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
+    
+    return to_stereo(note_wave * envelope, amplitude)
+
+def music_params(level):
+    """Get (note duration, harmonic count) for a level - faster and brighter as difficulty rises"""
+    return MUSIC_NOTE_SECONDS / (1 + (level - 1) * MUSIC_TEMPO_STEP), 3 + (level - 1) // 2
+
+def synth_pickup(sample_rate, duration, amplitude):
+    """Create power-up pickup sound"""
+    pickup_frames = int(duration * sample_rate)
+    t = np.linspace(0, duration, pickup_frames)
+    
+    # Create a pleasant ascending tone
+    frequency = 440 + t * 880  # Rising from A4 to A5
+    envelope = np.exp(-t * 3)  # Exponential decay
+    pickup_wave = envelope * np.sin(2 * np.pi * frequency * t)
+    return to_stereo(pickup_wave, amplitude)
+
+# Sound name -> (synthesis function, parameters), in the order they are loaded
+SOUND_RECIPES = {
+    'shoot': (synth_shoot, {'duration': 0.1, 'amplitude': 8000}),
+    'explosion': (synth_explosion, {'duration': 0.3, 'amplitude': 16000, 'seed': 1}),
+    'pickup': (synth_pickup, {'duration': 0.2, 'amplitude': 12000}),
+}
+
+def sound_cache_path(name, params, sample_rate):
+    """Get the cache file for a sound, keyed by a hash of its synthesis parameters"""
+    key = repr((name, sorted(params.items()), sample_rate, AUDIO_CACHE_VERSION))
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(AUDIO_CACHE_DIR, "audio", f"{name}-{digest}.npy")
+
+def load_sound_samples(name, sample_rate=AUDIO_SAMPLE_RATE):
+    """Get a sound's int16 stereo samples, memory-mapped from the disk cache or synthesized"""
+    synth, params = SOUND_RECIPES[name]
+    path = sound_cache_path(name, params, sample_rate)
     try:
-        import numpy as np
-        
-        # Create explosion sound (noise burst)
-        sample_rate = 22050
-        duration = 0.3  # 0.3 seconds
-        frames = int(duration * sample_rate)
-        
-        # Generate explosion noise
-        explosion_data = np.random.uniform(-1, 1, frames)
-        # Apply fade out envelope
-        fade_out = np.linspace(1, 0, frames)
-        explosion_data *= fade_out
-        # Scale to 16-bit range
-        explosion_data = (explosion_data * 16000).astype(np.int16)
-        
-        # Convert to stereo
-        stereo_explosion = np.column_stack((explosion_data, explosion_data))
-        sounds['explosion'] = pygame.sndarray.make_sound(stereo_explosion)
-        
-        # Create shooting sound (quick beep)
-        shoot_duration = 0.1
-        shoot_frames = int(shoot_duration * sample_rate)
-        t = np.linspace(0, shoot_duration, shoot_frames)
-        
-        # Create a quick rising tone
-        frequency = 800 + t * 2000  # Rising frequency
-        amplitude = np.linspace(1, 0, shoot_frames)  # Fade out
-        shoot_wave = amplitude * np.sin(2 * np.pi * frequency * t)
-        shoot_data = (shoot_wave * 8000).astype(np.int16)
-        
-        # Convert to stereo
-        stereo_shoot = np.column_stack((shoot_data, shoot_data))
-        sounds['shoot'] = pygame.sndarray.make_sound(stereo_shoot)
-        
-        # Create simple background music
-        music_duration = 4  # 4 seconds loop
-        music_frames = int(music_duration * sample_rate)
-        t = np.linspace(0, music_duration, music_frames)
-        
-        # Create a simple chord progression
-        notes = [261.63, 293.66, 329.63, 349.23]  # C, D, E, F
-        music_wave = np.zeros(music_frames)
-        
-        for i, freq in enumerate(notes):
-            start_frame = i * music_frames // len(notes)
-            end_frame = (i + 1) * music_frames // len(notes)
-            note_t = t[start_frame:end_frame] - t[start_frame]
-            
-            # Create note with harmonics
-            note_wave = (np.sin(2 * np.pi * freq * note_t) * 0.5 +
-                        np.sin(2 * np.pi * freq * 2 * note_t) * 0.3 +
-                        np.sin(2 * np.pi * freq * 3 * note_t) * 0.2)
-            
-            # Apply envelope
-            envelope = np.ones_like(note_t)
-            fade_samples = len(note_t) // 10
-            if fade_samples > 0:
-                envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
-                envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
-            
-            music_wave[start_frame:end_frame] = note_wave * envelope
-        
-        # Scale and convert to stereo
-        music_data = (music_wave * 3000).astype(np.int16)
-        stereo_music = np.column_stack((music_data, music_data))
-        sounds['music'] = pygame.sndarray.make_sound(stereo_music)
-        
-        # Create power-up pickup sound
-        pickup_duration = 0.2
-        pickup_frames = int(pickup_duration * sample_rate)
-        t = np.linspace(0, pickup_duration, pickup_frames)
-        
-        # Create a pleasant ascending tone
-        frequency = 440 + t * 880  # Rising from A4 to A5
-        amplitude = np.exp(-t * 3)  # Exponential decay
-        pickup_wave = amplitude * np.sin(2 * np.pi * frequency * t)
-        pickup_data = (pickup_wave * 12000).astype(np.int16)
-        
-        # Convert to stereo
-        stereo_pickup = np.column_stack((pickup_data, pickup_data))
-        sounds['pickup'] = pygame.sndarray.make_sound(stereo_pickup)
-        
-        print("Audio effects created successfully!")
-        return sounds
-        
-    except ImportError:
-        print("NumPy not available - audio effects disabled")
-        return {}
-    except Exception as e:
-        print(f"Could not create audio effects: {e}")
-        return {}
-
-class Particle:
-    """Simple particle for explosion effects"""
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-3, 3)
-        self.vy = random.uniform(-3, 3)
-        self.life = 30
-        self.max_life = 30
-        self.color = random.choice([RED, ORANGE, YELLOW])
+        return np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass  # Not cached yet (or unreadable) - synthesize it
     
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 1
-        self.vy += 0.1  # Gravity
+    samples = synth(sample_rate, **params)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, samples)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not cache {name} sound: {e}")
+    return samples
+
+class AudioLoader:
+    """Loads sound buffers on a background thread so the first frame isn't blocked"""
+    def __init__(self, sample_rate=AUDIO_SAMPLE_RATE, names=tuple(SOUND_RECIPES)):
+        self.ready = queue.Queue()
+        self.done = False
+        self.thread = threading.Thread(target=self.run, args=(sample_rate, names), daemon=True)
+        self.thread.start()
     
-    def draw(self, screen):
-        if self.life > 0:
-            alpha = self.life / self.max_life
-            size = int(3 * alpha)
-            if size > 0:
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), size)
-    
-    def is_alive(self):
-        return self.life > 0
-
-class EnemyBullet:
-    """Enemy bullet class"""
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.width = 4
-        self.height = 8
-        self.speed = ENEMY_BULLET_SPEED
-        self.rect = pygame.Rect(x, y, self.width, self.height)
+    def run(self, sample_rate, names):
+        """Thread body: load each sound in turn and hand it to the game"""
+        for name in names:
+            try:
+                self.ready.put((name, load_sound_samples(name, sample_rate)))
+            except Exception as e:
+                print(f"Could not create {name} sound: {e}")
+        self.ready.put(None)  # Finished
     
-    def update(self):
-        """Update enemy bullet position"""
-        self.y += self.speed
-        self.rect.y = self.y
+    def poll(self):
+        """Get the (name, samples) pairs that finished since the last poll, without blocking"""
+        loaded = []
+        while True:
+            try:
+                item = self.ready.get_nowait()
+            except queue.Empty:
+                return loaded
+            if item is None:
+                self.done = True
+                return loaded
+            loaded.append(item)
+
+class MusicStream:
+    """Background music synthesized note by note on a thread and streamed to a channel in small blocks
     
-    def draw(self, screen):
-        """Draw the enemy bullet"""
-        pygame.draw.rect(screen, RED, self.rect)
-        # Add glow effect
-        pygame.draw.rect(screen, ORANGE, (self.rect.x - 1, self.rect.y - 1, self.width + 2, self.height + 2), 1)
-    
-    def is_off_screen(self):
-        """Check if bullet is off screen"""
-        return self.y > SCREEN_HEIGHT
-
-class EnemyShip:
-    """Enemy ship class that shoots at the player"""
-    def __init__(self, x, y, level=1):
-        self.x = x
-        self.y = y
-        self.width = ENEMY_SHIP_WIDTH
-        self.height = ENEMY_SHIP_HEIGHT
-        self.speed = ENEMY_SHIP_SPEED + (level - 1) * 0.5  # Slightly faster at higher levels
-        self.rect = pygame.Rect(x, y, self.width, self.height)
+    The thread stays at most MUSIC_QUEUE_BLOCKS blocks ahead; pump() runs every frame and
+    keeps one block queued on the channel. If the channel ever runs dry while music is on,
+    that is counted as an underrun.
+    """
+    def __init__(self, channel, sample_rate=AUDIO_SAMPLE_RATE):
+        self.channel = channel
+        self.channel.set_volume(MUSIC_VOLUME)
+        self.blocks = queue.Queue(maxsize=MUSIC_QUEUE_BLOCKS)
+        self.level = 1  # Read by the synthesis thread at the start of each note
+        self.playing = False
+        self.fed = False  # Whether the channel has been given a block since play()
+        self.underruns = 0
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(sample_rate,), daemon=True)
+        self.thread.start()
+    
+    def run(self, sample_rate):
+        """Thread body: synthesize notes for the current level and cut them into blocks"""
+        note = 0
+        while not self.closed.is_set():
+            duration, harmonics = music_params(self.level)
+            wave = synth_music_note(sample_rate, MUSIC_NOTES[note % len(MUSIC_NOTES)], duration, harmonics,
+                                    MUSIC_AMPLITUDE)
+            note += 1
+            for start in range(0, len(wave), MUSIC_BLOCK_FRAMES):
+                block = wave[start:start + MUSIC_BLOCK_FRAMES]
+                while not self.closed.is_set():
+                    try:
+                        self.blocks.put(block, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+    
+    def pump(self, level):
+        """Pass the current level on and keep the channel's queue topped up"""
         self.level = level
-        self.shoot_timer = random.randint(30, ENEMY_SHOOT_COOLDOWN)  # Random initial delay
-        self.direction = random.choice([-1, 1])  # Movement direction
-        self.move_timer = 0
+        if not self.playing:
+            return
+        if self.fed and not self.channel.get_busy():
+            self.underruns += 1
+            self.fed = False
+        if self.channel.get_queue() is not None:
+            return
+        try:
+            block = self.blocks.get_nowait()
+        except queue.Empty:
+            return
+        self.channel.queue(pygame.sndarray.make_sound(block))
+        self.fed = True
     
-    def update(self):
-        """Update enemy ship position and shooting"""
-        # Move down
-        self.y += self.speed
-        self.rect.y = self.y
-        
-        # Side-to-side movement
-        self.move_timer += 1
-        if self.move_timer > 60:  # Change direction every second
-            self.direction *= -1
-            self.move_timer = 0
-        
-        # Move horizontally
-        self.x += self.direction * 1
-        if self.x <= 0 or self.x >= SCREEN_WIDTH - self.width:
-            self.direction *= -1
-        self.rect.x = self.x
-        
-        # Update shoot timer
-        self.shoot_timer -= 1
+    def play(self):
+        """Start (or resume) streaming"""
+        self.playing = True
     
-    def can_shoot(self):
-        """Check if enemy can shoot"""
-        return self.shoot_timer <= 0
+    def stop(self):
+        """Silence the music; synthesis pauses once the block queue is full"""
+        self.playing = False
+        self.fed = False
+        self.channel.stop()
     
-    def shoot(self):
-        """Create a bullet aimed at player position"""
-        self.shoot_timer = ENEMY_SHOOT_COOLDOWN - (self.level - 1) * 10  # Shoot faster at higher levels
-        bullet_x = self.x + self.width // 2 - 2
-        bullet_y = self.y + self.height
-        return EnemyBullet(bullet_x, bullet_y)
+    def close(self):
+        """Stop the synthesis thread"""
+        self.stop()
+        self.closed.set()
+
+class AudioManager:
+    """Owns the mixer channels: a reserved music channel plus a pool of effect voices
+    
+    Sounds are rate-limited so a chain of identical explosions starts one voice per
+    AUDIO_RATE_LIMIT window, whichever cues play them; only a cue of higher priority than
+    the one that last started the sound gets through (so game over is never swallowed by
+    an asteroid explosion). When every voice is busy a cue steals the oldest voice of
+    equal or lower priority (or is dropped).
+    """
+    def __init__(self, sounds, channels=AUDIO_CHANNELS):
+        self.sounds = sounds  # Shared with the game, filled in as the loader finishes
+        pygame.mixer.set_num_channels(channels)
+        pygame.mixer.set_reserved(1)
+        self.music_channel = pygame.mixer.Channel(0)
+        self.voices = [pygame.mixer.Channel(i) for i in range(1, channels)]
+        self.voice_priority = [0] * len(self.voices)
+        self.voice_started = [0.0] * len(self.voices)
+        self.voice_volume = [None] * len(self.voices)
+        self.last_played = {}  # Sound name -> (time, priority) of the last voice started with it
+        self.plays = 0
+        self.stolen = 0
+        self.rate_limited = 0
+        self.dropped = 0
+    
+    def play(self, cue):
+        """Start a sound cue on a free (or stolen) voice; returns the channel, or None if it was skipped"""
+        sound_name, volume, priority = SOUND_CUES[cue]
+        sound = self.sounds.get(sound_name)
+        if sound is None:
+            return None
+        now = time.perf_counter()
+        last_time, last_priority = self.last_played.get(sound_name, (-AUDIO_RATE_LIMIT, 0))
+        if now - last_time < AUDIO_RATE_LIMIT and priority <= last_priority:
+            self.rate_limited += 1
+            return None
+        
+        index = self.free_voice()
+        if index is None:
+            index = self.steal_voice(priority)
+            if index is None:
+                self.dropped += 1
+                return None
+            self.stolen += 1
+        
+        channel = self.voices[index]
+        channel.play(sound)
+        if self.voice_volume[index] != volume:
+            channel.set_volume(volume)
+            self.voice_volume[index] = volume
+        self.voice_priority[index] = priority
+        self.voice_started[index] = now
+        self.last_played[sound_name] = (now, priority)
+        self.plays += 1
+        return channel
+    
+    def free_voice(self):
+        """Index of an idle voice, or None"""
+        for index, channel in enumerate(self.voices):
+            if not channel.get_busy():
+                return index
+        return None
+    
+    def steal_voice(self, priority):
+        """Index of the oldest voice playing at or below the given priority, or None"""
+        candidates = [index for index, voice_priority in enumerate(self.voice_priority) if voice_priority <= priority]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda index: (self.voice_priority[index], self.voice_started[index]))
+    
+    def active_voices(self):
+        """Number of effect voices currently playing"""
+        return sum(channel.get_busy() for channel in self.voices)
+    
+    def stats(self):
+        """Get voice usage and skipped-play counters"""
+        return {
+            'voices': len(self.voices),
+            'active': self.active_voices(),
+            'plays': self.plays,
+            'stolen': self.stolen,
+            'rate_limited': self.rate_limited,
+            'dropped': self.dropped,
+        }
+
+class StarField:
+    """Scrolling parallax star field stored in NumPy arrays and drawn straight into the pixels"""
+    def __init__(self, layers=STAR_LAYERS, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        self.height = height
+        counts = [layer[0] for layer in layers]
+        total = sum(counts)
+        self.x = rng.integers(0, width, total).astype(np.int32)
+        self.y = rng.uniform(0, height, total).astype(np.float32)
+        self.speed = np.repeat(np.array([layer[1] for layer in layers], dtype=np.float32), counts)
+        self.drawn_y = self.y.astype(np.int32)  # Pixel rows the stars were last drawn at
+        
+        # Stars are grouped by layer, so each layer is one contiguous slice
+        self.layers = []
+        start = 0
+        for count, _, color, large in layers:
+            self.layers.append((start, start + count, color, large))
+            start += count
+    
+    def scroll(self, ticks=1.0):
+        """Move every star down by its layer's speed for the given number of ticks, wrapping at the bottom"""
+        self.y += self.speed * ticks
+        np.mod(self.y, self.height, out=self.y)
     
     def draw(self, screen):
-        """Draw the enemy ship"""
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
+        """Draw all stars, first erasing the old pixels of stars that moved to a new row
         
-        # Draw enemy ship as an inverted triangle (pointing down)
-        points = [
-            (center_x, self.y + self.height),  # Bottom point
-            (self.x, self.y),                  # Top left
-            (self.x + self.width, self.y)      # Top right
-        ]
+        Far layers move less than a pixel per tick, so most stars are redrawn where they
+        already were. Returns the moved stars' x with their old and new rows - the only
+        star pixels that changed on screen.
+        """
+        y = self.y.astype(np.int32)
+        moved = y != self.drawn_y
+        changed = self.x[moved], self.drawn_y[moved], y[moved]
+        self.plot(screen, self.drawn_y, moved, erase=True)
+        self.plot(screen, y)
+        self.drawn_y = y
+        return changed
+    
+    def plot(self, screen, y, only=None, erase=False):
+        """Draw the stars at rows y (only those in the `only` mask), or paint them black to erase them"""
+        if screen.get_bytesize() != 4:
+            # surfarray can't address this surface directly - draw star by star
+            for start, end, color, large in self.layers:
+                size = 2 if large else 1
+                keep = slice(None) if only is None else only[start:end]
+                for star_x, star_y in zip(self.x[start:end][keep].tolist(), y[start:end][keep].tolist()):
+                    screen.fill(BLACK if erase else color, (star_x, star_y, size, size))
+            return
+        
+        pixels = pygame.surfarray.pixels2d(screen)
+        try:
+            for start, end, color, large in self.layers:
+                star_x = self.x[start:end]
+                star_y = y[start:end]
+                if only is not None:
+                    star_x = star_x[only[start:end]]
+                    star_y = star_y[only[start:end]]
+                mapped = screen.map_rgb(BLACK if erase else color)
+                pixels[star_x, star_y] = mapped
+                if large:
+                    # Near stars are a small plus shape, clipped at the screen edges
+                    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                        arm_x = star_x + dx
+                        arm_y = star_y + dy
+                        inside = (arm_x >= 0) & (arm_x < self.width) & (arm_y >= 0) & (arm_y < self.height)
+                        pixels[arm_x[inside], arm_y[inside]] = mapped
+        finally:
+            del pixels
+
+class SpriteCache:
+    """LRU cache of pre-rendered entity sprites so drawing is a single blit"""
+    def __init__(self, max_size=SPRITE_CACHE_SIZE):
+        self.max_size = max_size
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """Get a cached sprite (marking it recently used), or None"""
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.sprites.move_to_end(key)
+        return sprite
+    
+    def put(self, key, sprite):
+        """Store a freshly rendered sprite, evicting the least recently used one if full"""
+        # Convert to the display format when there is one for the fastest blits
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert()
+            sprite.set_colorkey(BLACK, pygame.RLEACCEL)
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+    
+    def clear(self):
+        """Drop all cached sprites"""
+        self.sprites.clear()
+
+class TextCache:
+    """LRU cache of rendered text keyed by (font, string, color), so unchanged text isn't re-rendered"""
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.renders = 0
+    
+    def render(self, font, text, color):
+        """Get the rendered surface for a string, rendering it only the first time"""
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = font.render(text, True, color)
+        self.renders += 1
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class Hud:
+    """HUD layer: all HUD text composited onto one surface, rebuilt only when the text changes
+    
+    Items are (font, text, color, anchor, position) tuples, e.g. anchor 'topleft' or 'center'.
+    """
+    def __init__(self, text_cache, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.text_cache = text_cache
+        self.surface = pygame.Surface((width, height))
+        self.surface.set_colorkey(BLACK)
+        self.items = None
+        self.rects = []
+        self.rebuilds = 0
+        self.banners = {}
+    
+    def draw(self, screen, items):
+        """Blit the HUD for these items, recompositing only if they changed; returns the text rects"""
+        if items != self.items:
+            for rect in self.rects:
+                self.surface.fill(BLACK, rect)
+            self.rects = []
+            for font, text, color, anchor, position in items:
+                text_surface = self.text_cache.render(font, text, color)
+                rect = text_surface.get_rect(**{anchor: position})
+                self.surface.blit(text_surface, rect)
+                self.rects.append(rect)
+            self.items = items
+            self.rebuilds += 1
+        for rect in self.rects:
+            screen.blit(self.surface, rect, rect)
+        return self.rects
+    
+    def draw_banner(self, screen, font, text, color, center):
+        """Draw centered text over a semi-transparent backing box; returns the box rect"""
+        banner = self.banners.get((font, text, color))
+        if banner is None:
+            text_surface = self.text_cache.render(font, text, color)
+            banner = pygame.Surface((text_surface.get_width() + 40, text_surface.get_height() + 20))
+            banner.set_alpha(180)
+            banner.fill(BLACK)
+            self.banners[font, text, color] = (banner, text_surface)
+        else:
+            banner, text_surface = banner
+        rect = screen.blit(banner, banner.get_rect(center=center))
+        screen.blit(text_surface, text_surface.get_rect(center=center))
+        return rect
+
+def lerp_position(entity, alpha):
+    """Get an entity's draw position, alpha of the way from its previous tick's position to its current one"""
+    return (entity.prev_x + (entity.x - entity.prev_x) * alpha,
+            entity.prev_y + (entity.y - entity.prev_y) * alpha)
+
+def new_sprite_surface(width, height):
+    """Create a transparent (black colorkey) canvas with padding around an entity box"""
+    sprite = pygame.Surface((width + 2 * SPRITE_PADDING, height + 2 * SPRITE_PADDING))
+    sprite.set_colorkey(BLACK)
+    return sprite
+
+def render_box_sprite(width, height, color=WHITE):
+    """Render a plain filled box into a new sprite"""
+    sprite = new_sprite_surface(width, height)
+    pygame.draw.rect(sprite, color, (SPRITE_PADDING, SPRITE_PADDING, width, height))
+    return sprite
+
+fonts = {}
+
+def get_font(size):
+    """Get a shared default font of the given size"""
+    font = fonts.get(size)
+    if font is None:
+        font = fonts[size] = pygame.font.Font(None, size)
+    return font
+
+sprite_cache = SpriteCache()
+
+class DirtyRectRenderer:
+    """Erases and pushes only the screen regions drawn this frame or last frame
+    
+    Everything drawn is marked on a coarse tile grid. Each frame erases last frame's
+    tiles, the game redraws, and only the union of both frames' tiles (merged into
+    rectangles) is sent to the display. Untouched pixels are always black, so this
+    produces the same image as clearing and flipping the whole screen.
+    """
+    def __init__(self, screen, headless=False, enabled=True):
+        self.screen = screen
+        self.headless = headless
+        self.enabled = enabled
+        self.width, self.height = screen.get_size()
+        self.cols = -(-self.width // DIRTY_TILE_SIZE)
+        self.rows = -(-self.height // DIRTY_TILE_SIZE)
+        self.previous = np.zeros((self.rows, self.cols), dtype=bool)
+        self.current = np.zeros((self.rows, self.cols), dtype=bool)
+        self.marked = []  # Rects drawn this frame, rasterized onto the tile grid in bulk
+        self.points = []  # (x, y, radius) arrays of dots sent to the display without dirtying tiles
+        self.force_full = True  # Set when the whole window must be repainted
         
-        # Color based on level
-        ship_color = (min(255, 150 + self.level * 15), 0, 0)  # Gets redder with level
-        pygame.draw.polygon(screen, ship_color, points)
-        pygame.draw.polygon(screen, WHITE, points, 2)
+        # Statistics
+        self.frames = 0
+        self.full_frames = 0
+        self.pixels_pushed = 0
+        self.last_pixels_pushed = 0
+        self.last_rect_count = 0
+    
+    def begin_frame(self):
+        """Erase everything drawn last frame"""
+        self.current[:] = False
+        self.marked.clear()
+        self.points.clear()
+        if self.force_full or not self.enabled:
+            self.screen.fill(BLACK)
+        else:
+            for rect in self.tile_rects(self.previous):
+                self.screen.fill(BLACK, rect)
+    
+    def mark(self, rect):
+        """Record a drawn screen region"""
+        if rect:
+            self.marked.append(rect)
+    
+    def rasterize_marked(self):
+        """Set the tiles covered by every marked rect, using a 2D difference array"""
+        if not self.marked:
+            return
+        size = DIRTY_TILE_SIZE
+        rects = np.array(self.marked, dtype=np.int32).reshape(-1, 4)
+        left = np.clip(rects[:, 0], 0, self.width - 1) // size
+        top = np.clip(rects[:, 1], 0, self.height - 1) // size
+        right = np.clip(rects[:, 0] + rects[:, 2] - 1, 0, self.width - 1) // size + 1
+        bottom = np.clip(rects[:, 1] + rects[:, 3] - 1, 0, self.height - 1) // size + 1
+        on_screen = (rects[:, 0] < self.width) & (rects[:, 0] + rects[:, 2] > 0) & \
+                    (rects[:, 1] < self.height) & (rects[:, 1] + rects[:, 3] > 0)
+        left, top, right, bottom = left[on_screen], top[on_screen], right[on_screen], bottom[on_screen]
         
-        # Add engine glow
-        pygame.draw.circle(screen, ORANGE, (center_x, self.y), 3)
+        counts = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+        np.add.at(counts, (top, left), 1)
+        np.add.at(counts, (top, right), -1)
+        np.add.at(counts, (bottom, left), -1)
+        np.add.at(counts, (bottom, right), 1)
+        covered = counts.cumsum(axis=0).cumsum(axis=1)[:self.rows, :self.cols] > 0
+        self.current |= covered
+    
+    def mark_points(self, x, y, radius):
+        """Record many small drawn dots at once (radius must be smaller than a tile)"""
+        x = np.asarray(x, dtype=np.int32)
+        y = np.asarray(y, dtype=np.int32)
+        size = DIRTY_TILE_SIZE
+        visible = (x >= -radius) & (x < self.width + radius) & (y >= -radius) & (y < self.height + radius)
+        x = x[visible]
+        y = y[visible]
+        col_start = np.clip((x - radius) // size, 0, self.cols - 1)
+        col_end = np.clip((x + radius) // size, 0, self.cols - 1)
+        row_start = np.clip((y - radius) // size, 0, self.rows - 1)
+        row_end = np.clip((y + radius) // size, 0, self.rows - 1)
+        self.current[row_start, col_start] = True
+        self.current[row_start, col_end] = True
+        self.current[row_end, col_start] = True
+        self.current[row_end, col_end] = True
+    
+    def push_points(self, x, y, radius):
+        """Send small dots straight to the display this frame without dirtying their tiles
         
-        # Add level indicator for high-level ships
-        if self.level > 2:
-            level_text = pygame.font.Font(None, 16).render(str(self.level), True, WHITE)
-            text_rect = level_text.get_rect(center=(center_x, center_y))
-            screen.blit(level_text, text_rect)
+        Only for drawing that erases its own old pixels (the star field): the dots don't
+        need erasing next frame, so thousands of them cost a few pixels each instead of
+        marking most of the tile grid.
+        """
+        self.points.append((np.asarray(x, dtype=np.int32), np.asarray(y, dtype=np.int32), radius))
     
-    def is_off_screen(self):
-        """Check if enemy ship is off screen"""
-        return self.y > SCREEN_HEIGHT
+    def point_rects(self):
+        """This frame's pushed dots as Rects (which the garbage collector doesn't track, unlike lists)"""
+        rects = []
+        for x, y, radius in self.points:
+            size = [2 * radius + 1] * len(x)
+            rects.extend(map(pygame.Rect, (x - radius).tolist(), (y - radius).tolist(), size, size))
+        return rects
+    
+    def tile_rects(self, tiles):
+        """Merge marked tiles into rectangles: horizontal runs per row, stacked when rows match"""
+        size = DIRTY_TILE_SIZE
+        # Find every horizontal run of marked tiles in one pass (row-major order)
+        padded = np.zeros((self.rows, self.cols + 2), dtype=np.int8)
+        padded[:, 1:-1] = tiles
+        run_rows, run_cols = np.nonzero(np.diff(padded, axis=1))
+        
+        rects = []
+        open_runs = {}  # (col_start, col_end) -> Rect still growing downwards
+        runs = {}
+        current_row = -1
+        for row, col_start, col_end in zip(run_rows[::2].tolist(), run_cols[::2].tolist(), run_cols[1::2].tolist()):
+            if row != current_row:
+                # Runs that didn't continue into this row are finished
+                if row == current_row + 1:
+                    rects.extend(open_runs.values())
+                    open_runs = runs
+                else:
+                    rects.extend(open_runs.values())
+                    rects.extend(runs.values())
+                    open_runs = {}
+                runs = {}
+                current_row = row
+            rect = open_runs.pop((col_start, col_end), None)
+            if rect is None:
+                rect = pygame.Rect(col_start * size, row * size, (col_end - col_start) * size, size)
+            else:
+                rect.height += size
+            runs[col_start, col_end] = rect
+        rects.extend(open_runs.values())
+        rects.extend(runs.values())
+        screen_rect = self.screen.get_rect()
+        return [rect.clip(screen_rect) for rect in rects]
+    
+    def end_frame(self):
+        """Push this frame's changes to the display and record how many pixels were sent"""
+        self.rasterize_marked()
+        dirty = self.previous | self.current
+        full = self.force_full or not self.enabled or dirty.mean() > DIRTY_RECT_MAX_FRACTION
+        if full:
+            rects = None
+            pixels = self.width * self.height
+            self.full_frames += 1
+            self.last_rect_count = 1
+        else:
+            rects = self.tile_rects(dirty)
+            pixels = sum(rect.width * rect.height for rect in rects)
+            pixels += sum(len(x) * (2 * radius + 1) ** 2 for x, _, radius in self.points)
+            self.last_rect_count = len(rects) + sum(len(x) for x, _, _ in self.points)
+            if not self.headless:
+                rects += self.point_rects()
+        
+        if not self.headless:
+            if full:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+        
+        self.frames += 1
+        self.last_pixels_pushed = pixels
+        self.pixels_pushed += pixels
+        self.previous, self.current = self.current, self.previous
+        self.force_full = False
+    
+    def stats(self):
+        """Get average pixels pushed per frame and how often a full flip was needed"""
+        return {
+            'frames': self.frames,
+            'full_frames': self.full_frames,
+            'pixels_per_frame': self.pixels_pushed / self.frames if self.frames else 0,
+            'screen_fraction': self.pixels_pushed / (self.frames * self.width * self.height) if self.frames else 0,
+        }
 
-class PowerUp:
-    """Power-up class for special abilities"""
-    def __init__(self, x, y, powerup_type):
-        self.x = x
-        self.y = y
-        self.width = POWERUP_WIDTH
-        self.height = POWERUP_HEIGHT
-        self.speed = POWERUP_FALL_SPEED
-        self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.type = powerup_type  # 'shield' or 'rapid_fire'
-        self.pulse = 0  # For visual pulsing effect
+class FrameProfiler:
+    """Per-subsystem frame timing kept in ring buffers, with an overlay and JSON lines export
+    
+    Code calls lap(name) at the end of each phase; the time since the previous lap (or
+    begin_frame) is charged to that phase.
+    """
+    def __init__(self, history=PROFILER_HISTORY, export_path=None):
+        self.history = history
+        self.timings = {}  # Phase name -> ring buffer of seconds per frame
+        self.counts = {}  # Entity kind -> ring buffer of live counts per frame
+        self.current = {}
+        self.frame = 0
+        self.frame_start = 0.0
+        self.last_lap = 0.0
+        self.show_overlay = False
+        self.overlay = None
+        self.overlay_rect = None
+        self.export_file = open(export_path, 'w') if export_path else None
+    
+    def begin_frame(self):
+        """Start timing a new frame"""
+        self.current.clear()
+        self.frame_start = self.last_lap = time.perf_counter()
+    
+    def lap(self, name):
+        """Charge the time since the previous lap to the named phase"""
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + now - self.last_lap
+        self.last_lap = now
+    
+    def ring(self, buffers, name):
+        """Get (creating if needed) the ring buffer for a name"""
+        buffer = buffers.get(name)
+        if buffer is None:
+            buffer = buffers[name] = np.zeros(self.history, dtype=np.float64)
+        return buffer
+    
+    def end_frame(self, counts):
+        """Store this frame's phase timings and entity counts, and export them if enabled"""
+        self.current['frame'] = time.perf_counter() - self.frame_start
+        index = self.frame % self.history
+        for name in self.timings.keys() - self.current.keys():
+            self.timings[name][index] = 0.0
+        for name, seconds in self.current.items():
+            self.ring(self.timings, name)[index] = seconds
+        for name, count in counts.items():
+            self.ring(self.counts, name)[index] = count
+        
+        if self.export_file:
+            record = {
+                'frame': self.frame,
+                'ms': {name: round(seconds * 1000, 4) for name, seconds in self.current.items()},
+                'counts': counts,
+            }
+            self.export_file.write(json.dumps(record) + "\n")
+        self.frame += 1
+    
+    def percentiles(self):
+        """Get p50/p95/p99/max milliseconds for each phase over the recorded history"""
+        filled = min(self.frame, self.history)
+        if filled == 0:
+            return {}
+        summary = {}
+        for name, buffer in self.timings.items():
+            p50, p95, p99 = np.percentile(buffer[:filled], (50, 95, 99)) * 1000
+            summary[name] = {'p50': p50, 'p95': p95, 'p99': p99, 'max': buffer[:filled].max() * 1000}
+        return summary
+    
+    def draw_overlay(self, screen, font):
+        """Draw the timing overlay (refreshed every few frames); returns its rect, or None if hidden"""
+        if not self.show_overlay:
+            return None
+        if self.overlay is None or self.frame % PROFILER_OVERLAY_REFRESH == 0:
+            self.build_overlay(font)
+        return screen.blit(self.overlay, self.overlay_rect)
+    
+    def build_overlay(self, font):
+        """Render the overlay panel: one line per phase plus current entity counts"""
+        index = (self.frame - 1) % self.history
+        rows = [("phase", "p50 / p95 / p99 ms", WHITE)]
+        for name, stats in sorted(self.percentiles().items()):
+            color = RED if stats['p99'] > FRAME_BUDGET_MS else YELLOW if stats['p95'] > FRAME_BUDGET_MS / 4 else WHITE
+            rows.append((name, f"{stats['p50']:.2f} / {stats['p95']:.2f} / {stats['p99']:.2f}", color))
+        counts = "  ".join(f"{name}: {int(buffer[index])}" for name, buffer in self.counts.items())
+        
+        # Two columns: phase names, then their percentiles
+        rendered = [(font.render(name, True, color), font.render(values, True, color)) for name, values, color in rows]
+        counts_text = font.render(counts, True, GREEN)
+        name_width = max(name.get_width() for name, _ in rendered) + 15
+        line_height = font.get_linesize()
+        width = max(name_width + max(values.get_width() for _, values in rendered), counts_text.get_width()) + 10
+        height = line_height * (len(rendered) + 1) + 10
+        self.overlay = pygame.Surface((width, height))
+        self.overlay.set_alpha(200)
+        y = 5
+        for name, values in rendered:
+            self.overlay.blit(name, (5, y))
+            self.overlay.blit(values, (5 + name_width, y))
+            y += line_height
+        self.overlay.blit(counts_text, (5, y))
+        self.overlay_rect = self.overlay.get_rect(topright=(SCREEN_WIDTH - 10, 40))
+    
+    def close(self):
+        """Flush and close the export file"""
+        if self.export_file:
+            self.export_file.close()
+            self.export_file = None
+
+def expand_runs(first, counts):
+    """Flatten runs of indices [first, first + count) into (run number, index) arrays, one entry per index"""
+    runs = np.repeat(np.arange(len(counts)), counts)
+    indices = np.repeat(first - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+    return runs, indices
+
+def aabb_overlap_pairs(queries, targets):
+    """Find every overlapping (query row, target row) pair with a sweep and prune along x
+    
+    Targets are sorted by left edge once; each query then only tests the x-sorted run of
+    targets that can reach it, found with two binary searches. Queries are processed in
+    chunks so the candidate arrays stay bounded at any scale.
+    """
+    qx, qy, qw, qh = queries
+    tx, ty, tw, th = targets
+    if len(qx) == 0 or len(tx) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    order = np.argsort(tx, kind='stable')
+    sorted_x, sorted_y, sorted_w, sorted_h = tx[order], ty[order], tw[order], th[order]
+    widest = tw.max()
+    # Only targets with tx in (qx - widest, qx + qw) can overlap a query horizontally
+    first = np.searchsorted(sorted_x, qx - widest, side='right')
+    last = np.searchsorted(sorted_x, qx + qw, side='left')
+    counts = np.maximum(last - first, 0)
+    counts[(qw <= 0) | (qh <= 0)] = 0  # Empty boxes overlap nothing, like pygame
+    
+    query_rows = []
+    target_rows = []
+    for start in range(0, len(qx), AABB_QUERY_CHUNK):
+        chunk_counts = counts[start:start + AABB_QUERY_CHUNK]
+        total = int(chunk_counts.sum())
+        if total == 0:
+            continue
+        q, t = expand_runs(first[start:start + AABB_QUERY_CHUNK], chunk_counts)
+        q += start
+        # The search already bounds tx from above; test the remaining edges on sorted columns
+        hit = ((qx[q] < sorted_x[t] + sorted_w[t]) &
+               (qy[q] < sorted_y[t] + sorted_h[t]) & (sorted_y[t] < qy[q] + qh[q]))
+        query_rows.append(q[hit])
+        target_rows.append(order[t[hit]])
+    if not query_rows:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(query_rows), np.concatenate(target_rows)
+
+def aabb_first_hits(queries, targets):
+    """Match queries to the targets they hit, with first-hit semantics
+    
+    Both arguments are (x, y, width, height) array tuples. The result is what a loop over
+    the queries in order would give if each took the lowest-index overlapping target no
+    earlier query had taken. Returns (query rows, target rows) arrays of the hits, in query order.
+    
+    Instead of that loop, conflicts are resolved in rounds: every query proposes its lowest
+    remaining target, and a proposal is final once no lower query still wants that target.
+    """
+    q, t = aabb_overlap_pairs(queries, targets)
+    # Pairs come out grouped by query; one sort on a combined key orders each group by target
+    order = np.argsort(q * len(targets[0]) + t)
+    q, t = q[order], t[order]
+    hit_queries = []
+    hit_targets = []
+    while len(q):
+        # Pairs are sorted by (query, target), so each query's first pair is its proposal
+        proposal = np.ones(len(q), dtype=bool)
+        proposal[1:] = q[1:] != q[:-1]
+        proposed_q = q[proposal]
+        proposed_t = t[proposal]
+        
+        # Lowest query still wanting each target
+        lowest_query = np.full(len(targets[0]), len(queries[0]), dtype=np.intp)
+        np.minimum.at(lowest_query, t, q)
+        final = lowest_query[proposed_t] == proposed_q
+        hit_queries.append(proposed_q[final])
+        hit_targets.append(proposed_t[final])
+        
+        # Drop the resolved queries and every pair for a target that is now taken
+        resolved = np.zeros(len(queries[0]), dtype=bool)
+        resolved[proposed_q[final]] = True
+        taken = np.zeros(len(targets[0]), dtype=bool)
+        taken[proposed_t[final]] = True
+        keep = ~resolved[q] & ~taken[t]
+        q = q[keep]
+        t = t[keep]
+    if not hit_queries:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    hit_queries = np.concatenate(hit_queries)
+    hit_targets = np.concatenate(hit_targets)
+    order = np.argsort(hit_queries, kind='stable')
+    return hit_queries[order], hit_targets[order]
+
+class ParticleSystem:
+    """Explosion sparks stored as NumPy arrays (structure of arrays) and updated in bulk"""
+    COLORS = (RED, ORANGE, YELLOW)
+    
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0  # Live particles occupy the first `count` slots
+        self.dropped = 0
+        
+        # Pixel offsets covering a filled circle of each radius, for stamping through surfarray
+        self.stamps = {}
+        for radius in range(1, PARTICLE_MAX_RADIUS + 1):
+            offsets = [(dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                       if dx * dx + dy * dy <= radius * radius]
+            self.stamps[radius] = np.array(offsets, dtype=np.int32).T
+        self.sprites = {}
+    
+    def __len__(self):
+        return self.count
+    
+    def emit(self, x, y, amount):
+        """Spawn a burst of sparks at (x, y)"""
+        start = self.count
+        end = min(self.capacity, start + amount)
+        self.dropped += amount - (end - start)
+        if end <= start:
+            return
+        n = end - start
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = self.rng.uniform(-PARTICLE_MAX_SPEED, PARTICLE_MAX_SPEED, n)
+        self.vy[start:end] = self.rng.uniform(-PARTICLE_MAX_SPEED, PARTICLE_MAX_SPEED, n)
+        self.life[start:end] = PARTICLE_LIFE
+        self.color[start:end] = self.rng.integers(0, len(self.COLORS), n)
+        self.count = end
     
     def update(self):
-        """Update power-up position"""
-        self.y += self.speed
-        self.rect.y = self.y
-        self.pulse += 0.2
+        """Move every spark, apply gravity and decay, then compact out the dead ones"""
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
+        self.vy[:n] += PARTICLE_GRAVITY
+        
+        alive = self.life[:n] > 0
+        live_count = int(np.count_nonzero(alive))
+        if live_count < n:
+            for array in (self.x, self.y, self.vx, self.vy, self.life, self.color):
+                array[:live_count] = array[:n][alive]
+            self.count = live_count
+    
+    def clear(self):
+        """Remove all particles"""
+        self.count = 0
     
     def draw(self, screen):
-        """Draw the power-up with visual effects"""
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
-        
-        # Pulsing effect
-        pulse_size = int(3 * math.sin(self.pulse))
-        
-        if self.type == 'shield':
-            # Draw shield power-up (blue circle with cross)
-            pygame.draw.circle(screen, BLUE, (center_x, center_y), self.width // 2 + pulse_size)
-            pygame.draw.circle(screen, WHITE, (center_x, center_y), self.width // 2 + pulse_size, 3)
-            # Draw shield symbol (cross)
-            pygame.draw.line(screen, WHITE, (center_x - 8, center_y), (center_x + 8, center_y), 3)
-            pygame.draw.line(screen, WHITE, (center_x, center_y - 8), (center_x, center_y + 8), 3)
+        """Draw all sparks, shrinking as they fade"""
+        n = self.count
+        if n == 0:
+            return
+        # Same sizing as a single spark: radius 3 when fresh, gone below a third of its life
+        radius = (PARTICLE_MAX_RADIUS * self.life[:n].astype(np.int32)) // PARTICLE_LIFE
+        if screen.get_bytesize() == 4:
+            self.draw_pixels(screen, radius)
+        else:
+            self.draw_sprites(screen, radius)
+    
+    def draw_pixels(self, screen, radius):
+        """Stamp every spark straight into the surface pixels, one vectorized write per radius"""
+        n = self.count
+        width, height = screen.get_size()
+        colors = np.array([screen.map_rgb(color) for color in self.COLORS], dtype=np.uint32)
+        x = self.x[:n].astype(np.int32)
+        y = self.y[:n].astype(np.int32)
+        pixels = pygame.surfarray.pixels2d(screen)
+        try:
+            for size, (dx, dy) in self.stamps.items():
+                mask = radius == size
+                if not mask.any():
+                    continue
+                px = (x[mask][:, None] + dx).ravel()
+                py = (y[mask][:, None] + dy).ravel()
+                pc = np.repeat(colors[self.color[:n][mask]], dx.size)
+                visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[visible], py[visible]] = pc[visible]
+        finally:
+            del pixels
+    
+    def draw_sprites(self, screen, radius):
+        """Fallback for surfaces surfarray can't address directly: batch blit pre-rendered dots"""
+        n = self.count
+        if not self.sprites:
+            for size in self.stamps:
+                for index, color in enumerate(self.COLORS):
+                    sprite = pygame.Surface((size * 2 + 1, size * 2 + 1))
+                    sprite.set_colorkey(BLACK)
+                    pygame.draw.circle(sprite, color, (size, size), size)
+                    self.sprites[size, index] = sprite
+        visible = np.nonzero(radius > 0)[0]
+        screen.blits([(self.sprites[size, color], (x - size, y - size))
+                      for size, color, x, y in zip(radius[visible].tolist(), self.color[visible].tolist(),
+                                                   self.x[visible].astype(np.int32).tolist(),
+                                                   self.y[visible].astype(np.int32).tolist())],
+                     doreturn=False)
+
+def grid_neighbor_pairs(x, y, radius):
+    """Find every pair of points closer than radius, through a uniform grid of radius-sized cells
+    
+    Points are sorted by cell, so the candidates for a point are the contiguous runs of its
+    own cell and the 8 around it, all found with one pair of binary searches. Returns
+    (i, j) index arrays holding both orders of every close pair.
+    """
+    n = len(x)
+    if n < 2:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    cell_x = np.floor(x / radius).astype(np.int64)
+    cell_y = np.floor(y / radius).astype(np.int64)
+    cell_x -= cell_x.min() - 1
+    cell_y -= cell_y.min() - 1
+    stride = int(cell_y.max()) + 2  # Leaves an empty row of cells between columns for the -1/+1 offsets
+    keys = cell_x * stride + cell_y
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    
+    offsets = (np.arange(-1, 2)[:, None] * stride + np.arange(-1, 2)[None, :]).ravel()
+    neighbor_keys = (keys[None, :] + offsets[:, None]).ravel()
+    first = np.searchsorted(sorted_keys, neighbor_keys, side='left')
+    last = np.searchsorted(sorted_keys, neighbor_keys, side='right')
+    runs, positions = expand_runs(first, last - first)
+    i = runs % n
+    j = order[positions]
+    dx = x[i] - x[j]
+    dy = y[i] - y[j]
+    close = (i != j) & (dx * dx + dy * dy < radius * radius)
+    return i[close], j[close]
+
+def lead_target(x, y, target_x, target_y, target_vx, target_vy, speed):
+    """Velocities for shots from (x, y) at `speed` that meet a target moving at a constant velocity
+    
+    Solves |target + velocity * t - shooter| = speed * t for the earliest t > 0 per shooter;
+    when the target can't be caught, the shot goes straight at where it is now.
+    """
+    dx = target_x - x
+    dy = target_y - y
+    a = target_vx * target_vx + target_vy * target_vy - speed * speed
+    b = 2 * (dx * target_vx + dy * target_vy)
+    c = dx * dx + dy * dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if abs(a) < 1e-9:
+            t = np.where(b < 0, -c / b, np.nan)
+        else:
+            root = np.sqrt(b * b - 4 * a * c)
+            t1 = (-b - root) / (2 * a)
+            t2 = (-b + root) / (2 * a)
+            t = np.where((t1 > 0) & ((t1 < t2) | (t2 <= 0)), t1, np.where(t2 > 0, t2, np.nan))
+    aim_x = np.where(np.isfinite(t), dx + target_vx * t, dx)
+    aim_y = np.where(np.isfinite(t), dy + target_vy * t, dy)
+    length = np.maximum(np.hypot(aim_x, aim_y), 1e-9)
+    return aim_x * (speed / length), aim_y * (speed / length)
+
+class LevelTable:
+    """Per-level difficulty parameters, precomputed from the wave definitions in a levels file
+    
+    A wave covers a run of levels and gives each parameter as {"start", "step"} per level,
+    optionally with a "scale" factor, "min"/"max" clamps and "integer" truncation. Everything is
+    evaluated once at load. Each parameter becomes an array indexed by level (for vectorized
+    lookups by entity level), and params[level] holds the same values as plain Python numbers.
+    Files that can't produce a playable table are rejected with a ValueError naming the wave.
+    """
+    PARAMETERS = ('asteroid_spawn_interval', 'asteroid_speed_multiplier', 'asteroid_min_speed',
+                  'asteroid_max_speed', 'asteroid_points', 'enemy_spawn_chance', 'enemy_speed',
+                  'enemy_shoot_cooldown', 'enemy_points')
+    # Tick counts, integer speed ranges and points are always truncated to integers
+    INTEGER_PARAMETERS = ('asteroid_spawn_interval', 'asteroid_min_speed', 'asteroid_max_speed', 'asteroid_points',
+                          'enemy_shoot_cooldown', 'enemy_points')
+    TICK_PARAMETERS = ('asteroid_spawn_interval', 'enemy_shoot_cooldown')  # Must stay at least one tick
+    SPEC_KEYS = ('start', 'step', 'scale', 'min', 'max', 'integer')
+    
+    def __init__(self, path=LEVELS_PATH):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.digest = hashlib.sha256(raw).digest()[:8]  # Identifies the file in replay headers
+        data = json.loads(raw)
+        waves = data.get('waves') if isinstance(data, dict) else None
+        if not isinstance(waves, list) or not waves:
+            raise ValueError(f"{path}: needs a non-empty list of waves")
+        values = {name: [] for name in self.PARAMETERS}
+        self.thresholds = [0]  # Score needed to reach each level, from level 1
+        for number, wave in enumerate(waves, 1):
+            if not isinstance(wave, dict):
+                raise ValueError(f"{path}: wave {number} is not an object")
+            missing = [name for name in self.PARAMETERS + ('levels', 'points_per_level') if name not in wave]
+            if missing:
+                raise ValueError(f"{path}: wave {number} is missing {', '.join(missing)}")
+            for name in ('levels', 'points_per_level'):
+                if type(wave[name]) is not int or wave[name] < 1:
+                    raise ValueError(f"{path}: wave {number} {name} must be a positive integer")
+            for name in self.PARAMETERS:
+                try:
+                    wave_values = self.evaluate(wave[name], wave['levels'], name in self.INTEGER_PARAMETERS)
+                except ValueError as error:
+                    raise ValueError(f"{path}: wave {number} {name} {error}") from None
+                if name in self.TICK_PARAMETERS and min(wave_values) < 1:
+                    raise ValueError(f"{path}: wave {number} {name} must stay at least 1 tick")
+                values[name].extend(wave_values)
+            first_level = len(self.thresholds)
+            for level, low, high in zip(range(first_level, first_level + wave['levels']),
+                                        values['asteroid_min_speed'][-wave['levels']:],
+                                        values['asteroid_max_speed'][-wave['levels']:]):
+                if low > high:
+                    raise ValueError(f"{path}: wave {number} asteroid_min_speed is above asteroid_max_speed "
+                                     f"at level {level}")
+            for _ in range(wave['levels']):
+                self.thresholds.append(self.thresholds[-1] + wave['points_per_level'])
+        self.max_level = len(self.thresholds) - 1
+        self.thresholds.pop()  # There is no level past the last one
+        
+        # Index 0 repeats level 1 so tables can be indexed by level directly
+        for name in self.PARAMETERS:
+            setattr(self, name, np.array(values[name][:1] + values[name]))
+        self.params = [dict(zip(self.PARAMETERS, row)) for row in zip(*(values[name] for name in self.PARAMETERS))]
+        self.params.insert(0, self.params[0])
+    
+    @classmethod
+    def evaluate(cls, spec, levels, integer=False):
+        """Values of one parameter for each level of a wave, truncated to integers if asked or if the spec says so"""
+        if not isinstance(spec, dict) or 'start' not in spec:
+            raise ValueError('needs at least a "start" value')
+        unknown = sorted(spec.keys() - set(cls.SPEC_KEYS))
+        if unknown:
+            raise ValueError(f"has unknown keys {', '.join(unknown)}")
+        if not all(type(spec[key]) in (int, float) for key in cls.SPEC_KEYS[:-1] if key in spec):
+            raise ValueError("start, step, scale, min and max must be numbers")
+        integer = integer or spec.get('integer', False)
+        values = []
+        for i in range(levels):
+            value = spec.get('scale', 1) * (spec['start'] + i * spec.get('step', 0))
+            if 'min' in spec:
+                value = max(spec['min'], value)
+            if 'max' in spec:
+                value = min(spec['max'], value)
+            values.append(int(value) if integer else value)
+        return values
+    
+    def level_for(self, score):
+        """Level reached with a score"""
+        return bisect.bisect_right(self.thresholds, score)
+    
+    def next_threshold(self, level):
+        """Score needed to pass a level (infinite at the last level)"""
+        return self.thresholds[level] if level < self.max_level else float('inf')
+
+class TimerWheel:
+    """Hierarchical timer wheel keyed on the simulation tick
+    
+    Level 0 has one slot per tick for the next TIMER_WHEEL_SLOTS ticks, and each level above
+    covers TIMER_WHEEL_SLOTS times the span of the one below. A timer waits in the coarsest
+    slot that still separates it from now and is cascaded into a finer wheel when that slot
+    comes due, so advancing a tick costs O(expired timers) however many are pending.
+    """
+    def __init__(self, slots=TIMER_WHEEL_SLOTS, levels=TIMER_WHEEL_LEVELS):
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.levels = levels
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.tick = 0  # Last tick advanced to
+    
+    def insert(self, entry):
+        """Put a timer entry into the slot for its expiry"""
+        expiry = entry[0]
+        # Timers cascaded on their own expiry tick (a delay of 0) go to level 0
+        delay = max(expiry - self.tick, 1)
+        level = min(delay.bit_length() - 1, self.bits * self.levels - 1) // self.bits
+        self.wheels[level][(expiry >> (self.bits * level)) & self.mask].append(entry)
+    
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) when the wheel reaches `delay` ticks from now (at least 1); returns a handle"""
+        entry = [self.tick + max(1, delay), callback, args]
+        self.insert(entry)
+        return entry
+    
+    def cancel(self, handle):
+        """Stop a scheduled timer from firing (None and already fired handles are ignored)"""
+        if handle is not None:
+            handle[1] = None
+    
+    def advance(self):
+        """Move to the next tick and run every timer that expires on it"""
+        self.tick += 1
+        tick = self.tick
+        # Coarse slots coming due move down a level, coarsest first so timers settle in one pass
+        for level in range(self.levels - 1, 0, -1):
+            shift = self.bits * level
+            if tick & ((1 << shift) - 1) == 0:
+                wheel = self.wheels[level]
+                slot = (tick >> shift) & self.mask
+                entries, wheel[slot] = wheel[slot], []
+                for entry in entries:
+                    if entry[1] is not None:
+                        self.insert(entry)
+        wheel = self.wheels[0]
+        due, wheel[tick & self.mask] = wheel[tick & self.mask], []
+        for entry in due:
+            callback = entry[1]
+            if callback is not None:
+                entry[1] = None
+                callback(*entry[2])
+
+class ComponentStore:
+    """Every live object of one kind, stored as parallel NumPy arrays (structure of arrays)
+    
+    Position, previous position (for render interpolation), velocity and size are columns,
+    plus any per-kind FIELDS. Live objects occupy the first `count` rows in spawn order.
+    Systems advance all of them with one array operation, and remove() drops rows by
+    boolean mask while keeping the rest in order.
+    """
+    WIDTH = 0
+    HEIGHT = 0
+    FIELDS = {}  # Extra per-kind columns: name -> dtype
+    SPRITE_OFFSET = SPRITE_PADDING  # Distance from a sprite's corner to the object's box
+    
+    def __init__(self, capacity=ENTITY_STORE_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.high_water = 0
+        self.columns = dict(x=np.float64, y=np.float64, prev_x=np.float64, prev_y=np.float64,
+                            vx=np.float64, vy=np.float64, width=np.int32, height=np.int32, **self.FIELDS)
+        for name, dtype in self.columns.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+    
+    def __len__(self):
+        return self.count
+    
+    def grow(self):
+        """Double the capacity, keeping the live rows"""
+        self.capacity *= 2
+        for name, dtype in self.columns.items():
+            column = np.zeros(self.capacity, dtype=dtype)
+            column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+    
+    def add(self, x, y, vx, vy, **fields):
+        """Append one object and return its row"""
+        if self.count == self.capacity:
+            self.grow()
+        row = self.count
+        self.x[row] = self.prev_x[row] = x
+        self.y[row] = self.prev_y[row] = y
+        self.vx[row] = vx
+        self.vy[row] = vy
+        self.width[row] = self.WIDTH
+        self.height[row] = self.HEIGHT
+        for name, value in fields.items():
+            getattr(self, name)[row] = value
+        self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return row
+    
+    def move(self):
+        """Advance every object by its velocity, remembering where it was"""
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+    
+    def update(self):
+        """Run this kind's per-tick systems (plain movement unless a kind adds more)"""
+        self.move()
+    
+    def remove(self, mask):
+        """Drop the rows where mask is True, compacting the rest in order"""
+        n = self.count
+        keep = ~mask
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        for name in self.columns:
+            column = getattr(self, name)
+            column[:live] = column[:n][keep]
+        self.count = live
+    
+    def remove_rows(self, rows):
+        """Drop the given row indices"""
+        if len(rows):
+            mask = np.zeros(self.count, dtype=bool)
+            mask[rows] = True
+            self.remove(mask)
+    
+    def off_screen(self):
+        """Mask of objects that have fallen past the bottom of the screen"""
+        return self.y[:self.count] > SCREEN_HEIGHT
+    
+    def cull(self):
+        """Remove everything that has left the screen"""
+        self.remove(self.off_screen())
+    
+    def boxes(self):
+        """The live objects' (x, y, width, height) arrays"""
+        n = self.count
+        return self.x[:n], self.y[:n], self.width[:n], self.height[:n]
+    
+    def overlaps(self, rect):
+        """Mask of objects whose box overlaps rect (an empty rect overlaps nothing, like pygame)"""
+        n = self.count
+        if rect.width <= 0 or rect.height <= 0:
+            return np.zeros(n, dtype=bool)
+        x, y = self.x[:n], self.y[:n]
+        return ((x < rect.right) & (rect.x < x + self.width[:n]) &
+                (y < rect.bottom) & (rect.y < y + self.height[:n]))
+    
+    def centers(self, rows):
+        """(x, y) centers of the given rows, as lists"""
+        return ((self.x[rows] + self.width[rows] // 2).tolist(),
+                (self.y[rows] + self.height[rows] // 2).tolist())
+    
+    def clear(self):
+        """Remove all objects"""
+        self.count = 0
+    
+    def sprites(self):
+        """One cached sprite per live object: a plain box unless the kind draws its own"""
+        return [cached_sprite(('box', self.WIDTH, self.HEIGHT), render_box_sprite, self.WIDTH, self.HEIGHT)] * self.count
+    
+    def draw(self, screen, alpha=1.0):
+        """Blit every object at its interpolated position in one batch; returns the drawn rects"""
+        n = self.count
+        if n == 0:
+            return []
+        x = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha - self.SPRITE_OFFSET
+        y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha - self.SPRITE_OFFSET
+        return screen.blits(list(zip(self.sprites(), zip(x.tolist(), y.tolist()))))
+
+def cached_sprite(key, render, *args):
+    """Get a sprite from the cache, rendering it with render(*args) on a miss"""
+    sprite = sprite_cache.get(key)
+    if sprite is None:
+        sprite = sprite_cache.put(key, render(*args))
+    return sprite
+
+def render_bullet_sprite(width, height, color, glow):
+    """Render a bullet with a one pixel glow outline into a new sprite"""
+    sprite = pygame.Surface((width + 2, height + 2))
+    pygame.draw.rect(sprite, color, (1, 1, width, height))
+    pygame.draw.rect(sprite, glow, (0, 0, width + 2, height + 2), 1)
+    return sprite
+
+class BulletStore(ComponentStore):
+    """The player's bullets"""
+    WIDTH = BULLET_WIDTH
+    HEIGHT = BULLET_HEIGHT
+    SPRITE_OFFSET = 1
+    
+    def spawn(self, x, y):
+        """Fire a bullet upwards from (x, y)"""
+        return self.add(x, y, 0, -BULLET_SPEED)
+    
+    def off_screen(self):
+        """Mask of bullets that have left the top of the screen"""
+        return self.y[:self.count] < 0
+    
+    def sprites(self):
+        """Every bullet looks the same"""
+        return [cached_sprite(('bullet',), render_bullet_sprite, self.WIDTH, self.HEIGHT, YELLOW, WHITE)] * self.count
+
+class EnemyBulletStore(ComponentStore):
+    """Bullets fired by enemy ships"""
+    WIDTH = 4
+    HEIGHT = 8
+    SPRITE_OFFSET = 1
+    
+    def spawn(self, x, y, vx=0, vy=ENEMY_BULLET_SPEED):
+        """Fire an enemy bullet from (x, y), straight down unless given a velocity"""
+        return self.add(x, y, vx, vy)
+    
+    def off_screen(self):
+        """Aimed bullets can also leave through the sides or the top"""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        return (y > SCREEN_HEIGHT) | (y < -self.HEIGHT) | (x < -self.WIDTH) | (x > SCREEN_WIDTH)
+    
+    def sprites(self):
+        """Every enemy bullet looks the same"""
+        return [cached_sprite(('enemy_bullet',), render_bullet_sprite, self.WIDTH, self.HEIGHT, RED, ORANGE)] * self.count
+
+def render_enemy_sprite(level):
+    """Render an enemy ship for its level into a new sprite"""
+    width, height = ENEMY_SHIP_WIDTH, ENEMY_SHIP_HEIGHT
+    sprite = new_sprite_surface(width, height)
+    x = y = SPRITE_PADDING
+    center_x = x + width // 2
+    center_y = y + height // 2
+    
+    # Draw enemy ship as an inverted triangle (pointing down)
+    points = [
+        (center_x, y + height),  # Bottom point
+        (x, y),                  # Top left
+        (x + width, y)           # Top right
+    ]
+    
+    # Color based on level
+    ship_color = (min(255, 150 + level * 15), 0, 0)  # Gets redder with level
+    pygame.draw.polygon(sprite, ship_color, points)
+    pygame.draw.polygon(sprite, WHITE, points, 2)
+    
+    # Add engine glow
+    pygame.draw.circle(sprite, ORANGE, (center_x, y), 3)
+    
+    # Add level indicator for high-level ships
+    if level > 2:
+        level_text = get_font(16).render(str(level), True, WHITE)
+        text_rect = level_text.get_rect(center=(center_x, center_y))
+        sprite.blit(level_text, text_rect)
+    return sprite
+
+class EnemyShipStore(ComponentStore):
+    """Enemy ships that drift down, weave side to side and shoot straight down
+    
+    Turning and shooting run on the game's timer wheel. Timers carry the ship's uid, which
+    ascends with row order, and expired timers of ships that are already gone are dropped.
+    """
+    WIDTH = ENEMY_SHIP_WIDTH
+    HEIGHT = ENEMY_SHIP_HEIGHT
+    FIELDS = {'level': np.int16, 'uid': np.int64}
+    
+    def __init__(self, timers, levels, capacity=ENTITY_STORE_CAPACITY):
+        super().__init__(capacity)
+        self.timers = timers
+        self.levels = levels
+        self.next_uid = 0
+        self.turning = []  # uids whose turn timer expired this tick
+        self.loaded = []  # uids whose shot timer expired this tick
+    
+    def spawn(self, x, y, level=1):
+        """Add an enemy ship for a level"""
+        shoot_delay = random.randint(30, ENEMY_SHOOT_COOLDOWN)  # Random initial delay
+        direction = random.choice([-1, 1])  # Movement direction
+        speed = self.levels.params[level]['enemy_speed']  # Slightly faster at higher levels
+        uid = self.next_uid
+        self.next_uid += 1
+        # The spawn tick is the first tick of both countdowns
+        self.timers.schedule(shoot_delay - 1, self.loaded.append, uid)
+        self.timers.schedule(ENEMY_TURN_INTERVAL - 1, self.turning.append, uid)
+        return self.add(x, y, direction, speed, level=level, uid=uid)
+    
+    def take_rows(self, expired):
+        """Empty a list of expired uids, returning the rows of those ships still alive in row order"""
+        uids = np.array(expired, dtype=np.int64)
+        uids.sort()
+        expired.clear()
+        live = self.uid[:self.count]
+        rows = np.searchsorted(live, uids)
+        found = rows < len(live)
+        rows = rows[found]
+        return rows[live[rows] == uids[found]]
+    
+    def update(self):
+        """Move every ship, reversing direction when its turn timer expires and at the screen edges"""
+        if self.turning:
+            rows = self.take_rows(self.turning)
+            self.vx[rows] *= -1
+            for uid in self.uid[rows].tolist():
+                self.timers.schedule(ENEMY_TURN_INTERVAL, self.turning.append, uid)
+        
+        n = self.count
+        self.move()
+        x = self.x[:n]
+        at_edge = (x <= 0) | (x >= SCREEN_WIDTH - self.width[:n])
+        self.vx[:n][at_edge] *= -1
+    
+    def aim(self, x, y, target):
+        """Bullet velocities for shots fired from (x, y): straight down"""
+        return np.zeros(len(x)), np.full(len(x), float(ENEMY_BULLET_SPEED))
+    
+    def shoot(self, enemy_bullets, target=None):
+        """Every ship whose shot timer has expired fires a bullet; returns how many fired"""
+        if not self.loaded:
+            return 0
+        rows = self.take_rows(self.loaded)
+        cooldowns = self.levels.enemy_shoot_cooldown[self.level[rows]]  # Shoot faster at higher levels
+        for uid, cooldown in zip(self.uid[rows].tolist(), cooldowns.tolist()):
+            self.timers.schedule(cooldown, self.loaded.append, uid)
+        bullet_x = self.x[rows] + self.width[rows] // 2 - 2
+        bullet_y = self.y[rows] + self.height[rows]
+        bullet_vx, bullet_vy = self.aim(bullet_x, bullet_y, target)
+        for x, y, vx, vy in zip(bullet_x.tolist(), bullet_y.tolist(), bullet_vx.tolist(), bullet_vy.tolist()):
+            enemy_bullets.spawn(x, y, vx, vy)
+        return len(rows)
+    
+    def sprites(self):
+        """Ships are drawn by level"""
+        return [cached_sprite(('enemy', level), render_enemy_sprite, level)
+                for level in self.level[:self.count].tolist()]
+
+class SwarmShipStore(EnemyShipStore):
+    """Enemy ships flying as a swarm: squads in formation that flock together and lead their shots
+    
+    Each tick every ship steers towards its slot in its squad's formation, away from crowding
+    neighbors, and towards its neighbors' average heading and position. Neighbors come from a
+    uniform grid, and the steering for the whole swarm is summed with array operations.
+    """
+    FIELDS = dict(EnemyShipStore.FIELDS, home_x=np.float64, home_y=np.float64, phase=np.float64,
+                  descent=np.float64, max_speed=np.float64)
+    
+    def spawn(self, x, y, level=1):
+        """Add a squad of ships in formation around (x, y); returns the lead ship's row"""
+        speed = self.levels.params[level]['enemy_speed']
+        phase = random.uniform(0, 2 * math.pi)  # The squad sways together
+        rows = []
+        for offset_x, offset_y in SWARM_FORMATION:
+            shoot_delay = random.randint(30, ENEMY_SHOOT_COOLDOWN)  # Random initial delay
+            uid = self.next_uid
+            self.next_uid += 1
+            self.timers.schedule(shoot_delay - 1, self.loaded.append, uid)
+            home_x = min(max(x + offset_x, 0), SCREEN_WIDTH - self.WIDTH)
+            rows.append(self.add(home_x, y + offset_y, 0, speed, level=level, uid=uid, home_x=home_x,
+                                 home_y=y + offset_y, phase=phase, descent=speed * SWARM_DESCENT_FACTOR,
+                                 max_speed=speed * SWARM_SPEED_FACTOR))
+        return rows[0]
+    
+    def update(self):
+        """Steer the whole swarm (formation, separation, alignment, cohesion) and move it"""
+        n = self.count
+        if n == 0:
+            return
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        
+        # Formation: slots sweep down the screen, each squad swaying side to side
+        self.home_y[:n] += self.descent[:n]
+        slot_x = self.home_x[:n] + SWARM_SWAY * np.sin(self.phase[:n] + self.timers.tick * SWARM_SWAY_RATE)
+        slot_x = np.clip(slot_x, 0, SCREEN_WIDTH - self.width[:n])
+        ax = (slot_x - x) * SWARM_FORMATION_WEIGHT
+        ay = (self.home_y[:n] - y) * SWARM_FORMATION_WEIGHT
+        
+        # Flocking over neighbor pairs from the grid
+        i, j = grid_neighbor_pairs(x, y, SWARM_NEIGHBOR_RADIUS)
+        if len(i):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            dist2 = np.maximum(dx * dx + dy * dy, 1.0)
+            crowded = dist2 < SWARM_SEPARATION_RADIUS * SWARM_SEPARATION_RADIUS
+            push = np.where(crowded, SWARM_SEPARATION_WEIGHT / dist2, 0.0)
+            ax += np.bincount(i, weights=dx * push, minlength=n)
+            ay += np.bincount(i, weights=dy * push, minlength=n)
             
-        elif self.type == 'rapid_fire':
-            # Draw rapid fire power-up (red triangle with arrows)
-            pygame.draw.circle(screen, RED, (center_x, center_y), self.width // 2 + pulse_size)
-            pygame.draw.circle(screen, WHITE, (center_x, center_y), self.width // 2 + pulse_size, 3)
-            # Draw rapid fire symbol (up arrows)
-            points1 = [(center_x - 5, center_y + 5), (center_x - 5, center_y - 5), (center_x - 8, center_y - 2)]
-            points2 = [(center_x + 5, center_y + 5), (center_x + 5, center_y - 5), (center_x + 8, center_y - 2)]
-            pygame.draw.polygon(screen, WHITE, points1)
-            pygame.draw.polygon(screen, WHITE, points2)
-    
-    def is_off_screen(self):
-        """Check if power-up is off screen"""
-        return self.y > SCREEN_HEIGHT
+            neighbors = np.maximum(np.bincount(i, minlength=n), 1)
+            flocking = np.bincount(i, minlength=n) > 0
+            mean_vx = np.bincount(i, weights=vx[j], minlength=n) / neighbors
+            mean_vy = np.bincount(i, weights=vy[j], minlength=n) / neighbors
+            mean_x = np.bincount(i, weights=x[j], minlength=n) / neighbors
+            mean_y = np.bincount(i, weights=y[j], minlength=n) / neighbors
+            ax += np.where(flocking, (mean_vx - vx) * SWARM_ALIGNMENT_WEIGHT + (mean_x - x) * SWARM_COHESION_WEIGHT, 0.0)
+            ay += np.where(flocking, (mean_vy - vy) * SWARM_ALIGNMENT_WEIGHT + (mean_y - y) * SWARM_COHESION_WEIGHT, 0.0)
+        
+        # Limit the steering force and the resulting speed
+        force = np.maximum(np.hypot(ax, ay) / SWARM_MAX_FORCE, 1.0)
+        vx += ax / force
+        vy += ay / force
+        speed = np.maximum(np.hypot(vx, vy) / self.max_speed[:n], 1.0)
+        vx /= speed
+        vy /= speed
+        
+        self.move()
+        at_edge = ((x <= 0) & (vx < 0)) | ((x >= SCREEN_WIDTH - self.width[:n]) & (vx > 0))
+        vx[at_edge] *= -1
+    
+    def aim(self, x, y, target):
+        """Lead the target: shoot where it will be if it keeps moving the same way"""
+        if target is None:
+            return super().aim(x, y, target)
+        center_x = target.x + target.width / 2 - EnemyBulletStore.WIDTH / 2
+        center_y = target.y + target.height / 2 - EnemyBulletStore.HEIGHT / 2
+        return lead_target(x, y, center_x, center_y, target.x - target.prev_x, target.y - target.prev_y,
+                           ENEMY_BULLET_SPEED)
+
+def render_powerup_sprite(powerup_type, pulse_size):
+    """Render a power-up at one pulse size into a new sprite"""
+    width = POWERUP_WIDTH
+    sprite = new_sprite_surface(width, POWERUP_HEIGHT)
+    center_x = SPRITE_PADDING + width // 2
+    center_y = SPRITE_PADDING + POWERUP_HEIGHT // 2
+    
+    color = POWERUP_TYPES[powerup_type][2]
+    pygame.draw.circle(sprite, color, (center_x, center_y), width // 2 + pulse_size)
+    pygame.draw.circle(sprite, WHITE, (center_x, center_y), width // 2 + pulse_size, 3)
+    if powerup_type == 'shield':
+        # Draw shield symbol (cross)
+        pygame.draw.line(sprite, WHITE, (center_x - 8, center_y), (center_x + 8, center_y), 3)
+        pygame.draw.line(sprite, WHITE, (center_x, center_y - 8), (center_x, center_y + 8), 3)
+        
+    elif powerup_type == 'rapid_fire':
+        # Draw rapid fire symbol (up arrows)
+        points1 = [(center_x - 5, center_y + 5), (center_x - 5, center_y - 5), (center_x - 8, center_y - 2)]
+        points2 = [(center_x + 5, center_y + 5), (center_x + 5, center_y - 5), (center_x + 8, center_y - 2)]
+        pygame.draw.polygon(sprite, WHITE, points1)
+        pygame.draw.polygon(sprite, WHITE, points2)
+    return sprite
+
+class PowerUpStore(ComponentStore):
+    """Falling power-ups for special abilities"""
+    WIDTH = POWERUP_WIDTH
+    HEIGHT = POWERUP_HEIGHT
+    FIELDS = {'kind': np.int8, 'pulse': np.float64}
+    TYPES = tuple(POWERUP_TYPES)
+    CUM_WEIGHTS = list(accumulate(weight for weight, _, _ in POWERUP_TYPES.values()))
+    
+    def spawn(self, x, y, powerup_type):
+        """Add a power-up of a type from TYPES"""
+        return self.add(x, y, 0, POWERUP_FALL_SPEED, kind=self.TYPES.index(powerup_type), pulse=0)
+    
+    def spawn_random(self, x, y):
+        """Add a power-up of a type picked by spawn weight"""
+        return self.spawn(x, y, random.choices(self.TYPES, cum_weights=self.CUM_WEIGHTS)[0])
+    
+    def update(self):
+        """Fall and pulse"""
+        self.move()
+        self.pulse[:self.count] += 0.2  # For visual pulsing effect
+    
+    def sprites(self):
+        """Power-ups are drawn by type and current pulse size"""
+        n = self.count
+        pulse_sizes = (3 * np.sin(self.pulse[:n])).astype(np.int32).tolist()
+        return [cached_sprite(('powerup', kind, size), render_powerup_sprite, self.TYPES[kind], size)
+                for kind, size in zip(self.kind[:n].tolist(), pulse_sizes)]
+
+def render_asteroid_sprite(level, rotation):
+    """Render an asteroid for its level at one rotation into a new sprite"""
+    width = ASTEROID_WIDTH
+    sprite = new_sprite_surface(width, ASTEROID_HEIGHT)
+    center_x = SPRITE_PADDING + width // 2
+    center_y = SPRITE_PADDING + ASTEROID_HEIGHT // 2
+    
+    # Color changes based on level - higher levels are more red/dangerous looking
+    base_color = (min(255, GRAY[0] + level * 10), 
+                 max(0, GRAY[1] - level * 5), 
+                 max(0, GRAY[2] - level * 5))
+    outline_color = (min(255, RED[0]), 
+                    max(0, RED[1] - level * 10), 
+                    max(0, RED[2] - level * 10))
+    
+    # Draw asteroid as an irregular shape
+    pygame.draw.circle(sprite, base_color, (center_x, center_y), width // 2)
+    pygame.draw.circle(sprite, outline_color, (center_x, center_y), width // 2, 3)
+    
+    # Add some detail lines for rotation effect
+    for i in range(3):
+        angle = rotation + i * 120
+        end_x = center_x + int((width // 3) * math.cos(math.radians(angle)))
+        end_y = center_y + int((width // 3) * math.sin(math.radians(angle)))
+        pygame.draw.line(sprite, WHITE, (center_x, center_y), (end_x, end_y), 2)
+    
+    # Add level indicator for high-level asteroids
+    if level > 3:
+        level_text = get_font(20).render(str(level), True, WHITE)
+        text_rect = level_text.get_rect(center=(center_x, center_y))
+        sprite.blit(level_text, text_rect)
+    return sprite
+
+class AsteroidStore(ComponentStore):
+    """Tumbling asteroids, faster at higher levels"""
+    WIDTH = ASTEROID_WIDTH
+    HEIGHT = ASTEROID_HEIGHT
+    FIELDS = {'level': np.int16, 'rotation': np.float64, 'rotation_speed': np.float64}
+    
+    def __init__(self, levels, capacity=ENTITY_STORE_CAPACITY):
+        super().__init__(capacity)
+        self.levels = levels
+    
+    def spawn(self, x, y, level=1):
+        """Add an asteroid for a level"""
+        # Speed increases with level
+        params = self.levels.params[level]
+        speed = random.randint(params['asteroid_min_speed'], params['asteroid_max_speed'])
+        rotation_speed = random.uniform(-5, 5) * params['asteroid_speed_multiplier']
+        return self.add(x, y, 0, speed, level=level, rotation=0, rotation_speed=rotation_speed)
+    
+    def update(self):
+        """Fall and spin"""
+        self.move()
+        n = self.count
+        self.rotation[:n] += self.rotation_speed[:n]
+    
+    def sprites(self):
+        """Asteroids are drawn by level and rotation"""
+        n = self.count
+        # The three detail lines repeat every 120 degrees, so that is all we need to cache
+        buckets = (np.mod(self.rotation[:n], 120).astype(np.int32) // SPRITE_ROTATION_STEP).tolist()
+        return [cached_sprite(('asteroid', level, bucket), render_asteroid_sprite, level,
+                              bucket * SPRITE_ROTATION_STEP)
+                for level, bucket in zip(self.level[:n].tolist(), buckets)]
 
 class Player:
     """Player spaceship class"""
-    def __init__(self, x, y):
+    def __init__(self, x, y, timers):
         self.x = x
         self.y = y
         self.width = PLAYER_WIDTH
         self.height = PLAYER_HEIGHT
         self.speed = PLAYER_SPEED
+        self.prev_x = x
+        self.prev_y = y
         self.rect = pygame.Rect(x, y, self.width, self.height)
         
-        # Power-up states
-        self.has_shield = False
-        self.shield_timer = 0
-        self.rapid_fire = False
-        self.rapid_fire_timer = 0
-        self.shoot_cooldown = 0
+        # Power-up effects: kind -> expiry timers of its active stacks, soonest first
+        self.timers = timers
+        self.effects = {kind: [] for kind in POWERUP_TYPES}
+        self.cooling_down = False
     
     def move_left(self):
         """Move player left"""
@@ -366,186 +1909,356 @@ class Player:
             self.x += self.speed
             self.rect.x = self.x
     
-    def update(self):
-        """Update player state including power-ups"""
-        # Update shield
-        if self.has_shield:
-            self.shield_timer -= 1
-            if self.shield_timer <= 0:
-                self.has_shield = False
-        
-        # Update rapid fire
-        if self.rapid_fire:
-            self.rapid_fire_timer -= 1
-            if self.rapid_fire_timer <= 0:
-                self.rapid_fire = False
-        
-        # Update shoot cooldown
-        if self.shoot_cooldown > 0:
-            self.shoot_cooldown -= 1
+    def box(self):
+        """The player's (x, y, width, height) as one-row arrays, for the collision kernel"""
+        rect = self.rect
+        return (np.array([rect.x], dtype=np.float64), np.array([rect.y], dtype=np.float64),
+                np.array([rect.width], dtype=np.int32), np.array([rect.height], dtype=np.int32))
+    
+    def add_effect(self, kind):
+        """Add a stack of a power-up effect; stacks expire independently"""
+        duration = POWERUP_TYPES[kind][1]
+        self.effects[kind].append(self.timers.schedule(duration, self.expire_effect, kind))
+    
+    def expire_effect(self, kind):
+        """The oldest stack of an effect ran out"""
+        self.effects[kind].pop(0)
+    
+    def has_effect(self, kind):
+        """Check if any stack of an effect is active"""
+        return bool(self.effects[kind])
+    
+    def consume_effect(self, kind):
+        """Use up the oldest stack of an effect"""
+        self.timers.cancel(self.effects[kind].pop(0))
+    
+    def clear_effects(self):
+        """Drop every effect stack"""
+        for stacks in self.effects.values():
+            for handle in stacks:
+                self.timers.cancel(handle)
+            stacks.clear()
+    
+    def end_cooldown(self):
+        """Shoot cooldown expired"""
+        self.cooling_down = False
     
     def can_shoot(self):
         """Check if player can shoot based on rapid fire state"""
-        return self.shoot_cooldown <= 0
+        return not self.cooling_down
     
     def shoot(self):
         """Handle shooting with appropriate cooldown"""
-        if self.rapid_fire:
-            self.shoot_cooldown = RAPID_FIRE_COOLDOWN
-        else:
-            self.shoot_cooldown = 15  # Normal shooting cooldown
-    
-    def activate_shield(self):
-        """Activate shield power-up"""
-        self.has_shield = True
-        self.shield_timer = SHIELD_DURATION
-    
-    def activate_rapid_fire(self):
-        """Activate rapid fire power-up"""
-        self.rapid_fire = True
-        self.rapid_fire_timer = RAPID_FIRE_DURATION
+        self.cooling_down = True
+        cooldown = RAPID_FIRE_COOLDOWN if self.has_effect('rapid_fire') else SHOOT_COOLDOWN
+        self.timers.schedule(cooldown, self.end_cooldown)
     
     def take_damage(self):
         """Handle taking damage - returns True if player dies"""
-        if self.has_shield:
-            self.has_shield = False
-            self.shield_timer = 0
+        if self.has_effect('shield'):
+            self.consume_effect('shield')
             return False  # Shield absorbed the hit
         else:
             return True  # Player dies
     
-    def draw(self, screen):
-        """Draw the player spaceship"""
+    def render_sprite(self):
+        """Render the player spaceship into a new sprite"""
+        sprite = new_sprite_surface(self.width, self.height)
+        x = y = SPRITE_PADDING
         # Draw spaceship as a triangle with more detail
         points = [
-            (self.x + self.width // 2, self.y),  # Top point
-            (self.x, self.y + self.height),      # Bottom left
-            (self.x + self.width, self.y + self.height)  # Bottom right
+            (x + self.width // 2, y),  # Top point
+            (x, y + self.height),      # Bottom left
+            (x + self.width, y + self.height)  # Bottom right
         ]
-        pygame.draw.polygon(screen, GREEN, points)
+        pygame.draw.polygon(sprite, GREEN, points)
         # Add a small rectangle for the body
-        pygame.draw.rect(screen, BLUE, (self.x + 15, self.y + 20, 20, 15))
+        pygame.draw.rect(sprite, BLUE, (x + 15, y + 20, 20, 15))
         # Add engine glow
-        pygame.draw.circle(screen, YELLOW, (self.x + self.width // 2, self.y + self.height), 5)
+        pygame.draw.circle(sprite, YELLOW, (x + self.width // 2, y + self.height), 5)
+        return sprite
+    
+    def render_shield_sprite(self):
+        """Render the shield bubble drawn around a shielded player into a new sprite"""
+        sprite = new_sprite_surface(self.width, self.height)
+        pygame.draw.ellipse(sprite, BLUE, sprite.get_rect().inflate(-2, -2), 2)
+        return sprite
+    
+    def draw(self, screen, alpha=1.0):
+        """Draw the player spaceship (and its shield, if any) from the sprite cache"""
+        x, y = lerp_position(self, alpha)
+        position = (x - SPRITE_PADDING, y - SPRITE_PADDING)
+        rect = screen.blit(cached_sprite(('player',), self.render_sprite), position)
+        if self.has_effect('shield'):
+            rect = rect.union(screen.blit(cached_sprite(('shield',), self.render_shield_sprite), position))
+        return rect
 
-class Bullet:
-    """Bullet class"""
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.width = BULLET_WIDTH
-        self.height = BULLET_HEIGHT
-        self.speed = BULLET_SPEED
-        self.rect = pygame.Rect(x, y, self.width, self.height)
+class SimulatedKeys:
+    """Stand-in for pygame.key.get_pressed() when running headless"""
+    def __init__(self, held):
+        self.held = held
     
-    def update(self):
-        """Update bullet position"""
-        self.y -= self.speed
-        self.rect.y = self.y
+    def __getitem__(self, key):
+        return key in self.held
+
+def bot_pilot(game):
+    """Simple scripted pilot for headless runs: dodge the closest threat and keep firing"""
+    player = game.player
+    player_center = player.x + player.width // 2
+    game.held_keys.clear()
     
-    def draw(self, screen):
-        """Draw the bullet with a glow effect"""
-        pygame.draw.rect(screen, YELLOW, self.rect)
-        # Add glow effect
-        pygame.draw.rect(screen, WHITE, (self.rect.x - 1, self.rect.y - 1, self.width + 2, self.height + 2), 1)
-    
-    def is_off_screen(self):
-        """Check if bullet is off screen"""
-        return self.y < 0
-
-class Asteroid:
-    """Asteroid enemy class"""
-    def __init__(self, x, y, level=1):
-        self.x = x
-        self.y = y
-        self.width = ASTEROID_WIDTH
-        self.height = ASTEROID_HEIGHT
-        
-        # Speed increases with level
-        speed_multiplier = 1 + (level - 1) * 0.3  # 30% speed increase per level
-        min_speed = int(ASTEROID_BASE_MIN_SPEED * speed_multiplier)
-        max_speed = int(ASTEROID_BASE_MAX_SPEED * speed_multiplier)
-        self.speed = random.randint(min_speed, max_speed)
-        
-        self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.rotation = 0
-        self.rotation_speed = random.uniform(-5, 5) * speed_multiplier
-        self.level = level
-        
-        # Visual changes based on level
-        self.color_intensity = min(255, 128 + level * 15)  # Gets redder with higher levels
+    # Dodge anything about to land on the player (asteroids first, then enemy bullets)
+    for store in (game.asteroids, game.enemy_bullets):
+        x, y, width, _ = store.boxes()
+        centers = x + width // 2
+        threats = np.flatnonzero((player.y - 120 < y) & (y < player.y + player.height) &
+                                 (np.abs(centers - player_center) < player.width))
+        if len(threats):
+            obj_center = centers[threats[0]]
+            escape_left = obj_center >= player_center and player.x > player.width
+            escape_left = escape_left or player.x >= SCREEN_WIDTH - 2 * player.width
+            game.held_keys.add(pygame.K_LEFT if escape_left else pygame.K_RIGHT)
+            break
+    else:
+        # Otherwise line up under the lowest asteroid or enemy ship
+        best_y = best_center = None
+        for store in (game.asteroids, game.enemy_ships):
+            x, y, width, _ = store.boxes()
+            candidates = np.flatnonzero(y < player.y - 120)
+            if len(candidates):
+                lowest = candidates[np.argmax(y[candidates])]
+                if best_y is None or y[lowest] > best_y:
+                    best_y = y[lowest]
+                    best_center = x[lowest] + width[lowest] // 2
+        if best_center is not None:
+            if best_center < player_center - player.speed:
+                game.held_keys.add(pygame.K_LEFT)
+            elif best_center > player_center + player.speed:
+                game.held_keys.add(pygame.K_RIGHT)
     
-    def update(self):
-        """Update asteroid position"""
-        self.y += self.speed
-        self.rect.y = self.y
-        self.rotation += self.rotation_speed
+    # Fire at roughly the normal keyboard rate
+    bullet_y = game.bullets.boxes()[1]
+    if (bullet_y.max() if len(bullet_y) else 0) < player.y - 100:
+        game.fire_bullet()
+
+def random_pilot(game):
+    """Headless pilot that mashes keys: holds a random direction for a while and fires at random"""
+    rng = game.pilot_rng
+    if rng.random() < 0.05:
+        game.held_keys = {rng.choice((pygame.K_LEFT, pygame.K_RIGHT))} if rng.random() < 0.8 else set()
+    if rng.random() < 0.1:
+        game.fire_bullet()
+
+PILOTS = {'bot': bot_pilot, 'random': random_pilot}
+
+class InputDispatcher:
+    """Drains the SDL event queue once per frame and routes events through the binding tables
     
-    def draw(self, screen):
-        """Draw the asteroid with rotation effect and level-based coloring"""
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
-        
-        # Color changes based on level - higher levels are more red/dangerous looking
-        base_color = (min(255, GRAY[0] + self.level * 10), 
-                     max(0, GRAY[1] - self.level * 5), 
-                     max(0, GRAY[2] - self.level * 5))
-        outline_color = (min(255, RED[0]), 
-                        max(0, RED[1] - self.level * 10), 
-                        max(0, RED[2] - self.level * 10))
-        
-        # Draw asteroid as an irregular shape
-        pygame.draw.circle(screen, base_color, (center_x, center_y), self.width // 2)
-        pygame.draw.circle(screen, outline_color, (center_x, center_y), self.width // 2, 3)
-        
-        # Add some detail lines for rotation effect
-        import math
-        for i in range(3):
-            angle = self.rotation + i * 120
-            end_x = center_x + int((self.width // 3) * math.cos(math.radians(angle)))
-            end_y = center_y + int((self.width // 3) * math.sin(math.radians(angle)))
-            pygame.draw.line(screen, WHITE, (center_x, center_y), (end_x, end_y), 2)
-        
-        # Add level indicator for high-level asteroids
-        if self.level > 3:
-            level_text = pygame.font.Font(None, 20).render(str(self.level), True, WHITE)
-            text_rect = level_text.get_rect(center=(center_x, center_y))
-            screen.blit(level_text, text_rect)
-    
-    def is_off_screen(self):
-        """Check if asteroid is off screen"""
-        return self.y > SCREEN_HEIGHT
+    Each key press is timestamped when it is drained. After a frame reaches the display,
+    present() records the input-to-photon latency of every press that frame shows: actions
+    apply immediately, while movement only shows once a simulation tick has read the keys.
+    """
+    def __init__(self, handlers, history=INPUT_LATENCY_HISTORY):
+        self.handlers = handlers  # Action name -> callable
+        self.pending = []  # (timestamp, waits for a tick) of presses not yet on screen
+        self.latencies = np.zeros(history, dtype=np.float64)
+        self.count = 0
+    
+    def filter_events(self):
+        """Have SDL drop every event type without a binding instead of queueing it"""
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(EVENT_BINDINGS))
+    
+    def poll(self):
+        """Dispatch every queued event"""
+        now = time.perf_counter()
+        for event in pygame.event.get():
+            action = EVENT_BINDINGS.get(event.type)
+            if action == 'key':
+                action = KEY_BINDINGS.get(event.key)
+                if action is None:
+                    continue
+                self.pending.append((now, action == 'move'))
+            handler = self.handlers.get(action)
+            if handler:
+                handler()
+    
+    def present(self, ticks):
+        """Record the latency of presses shown by the frame just displayed"""
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        waiting = []
+        for stamp, needs_tick in self.pending:
+            if needs_tick and not ticks:
+                waiting.append((stamp, needs_tick))
+                continue
+            self.latencies[self.count % len(self.latencies)] = now - stamp
+            self.count += 1
+        self.pending = waiting
+    
+    def latency_percentiles(self):
+        """Get p50/p95/p99/max input-to-photon milliseconds over the recorded presses"""
+        filled = min(self.count, len(self.latencies))
+        if filled == 0:
+            return None
+        p50, p95, p99 = np.percentile(self.latencies[:filled], (50, 95, 99)) * 1000
+        return {'inputs': self.count, 'p50': p50, 'p95': p95, 'p99': p99, 'max': self.latencies[:filled].max() * 1000}
+
+class InputRecorder:
+    """Records a session's per-tick input and score trajectory to a compact binary replay file"""
+    def __init__(self, path, seed, swarm=False, levels_digest=bytes(8)):
+        # Checked up front: the header can only hold an unsigned 64-bit seed, and finding out
+        # when the file is written at exit would lose the whole session
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError(f"Recorded sessions need a seed from 0 to 2**64 - 1, not {seed}")
+        self.path = path
+        self.seed = seed
+        self.flags = REPLAY_FLAG_SWARM if swarm else 0
+        self.levels_digest = levels_digest
+        self.inputs = bytearray()
+        self.actions = []  # Actions taken since the last recorded tick
+        self.trajectory = []
+        self.last_point = (0, 1)
+        self.ticks = 0
+    
+    def action(self, code):
+        """Note a one-off action (fire, restart) that applies before the next tick"""
+        self.actions.append(code)
+    
+    def record_tick(self, keys):
+        """Record the held movement keys and pending actions for the tick about to run"""
+        mask = 0
+        if any(keys[key] for key in MOVE_LEFT_KEYS):
+            mask |= REPLAY_KEY_LEFT
+        if any(keys[key] for key in MOVE_RIGHT_KEYS):
+            mask |= REPLAY_KEY_RIGHT
+        if any(keys[key] for key in FIRE_KEYS):
+            mask |= REPLAY_KEY_FIRE
+        if self.actions:
+            self.inputs.append(mask | REPLAY_HAS_ACTIONS)
+            self.inputs.append(len(self.actions))
+            self.inputs.extend(self.actions)
+            self.actions.clear()
+        else:
+            self.inputs.append(mask)
+        self.ticks += 1
+    
+    def record_progress(self, score, level):
+        """Add a trajectory point whenever the score or level changes"""
+        if (score, level) != self.last_point:
+            self.last_point = (score, level)
+            self.trajectory.append((self.ticks, score, level))
+    
+    def close(self):
+        """Write the replay file (through a temporary file, so a failed write never leaves a partial replay)"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.ticks, len(self.trajectory),
+                                       self.flags, self.levels_digest))
+            for point in self.trajectory:
+                f.write(REPLAY_POINT.pack(*point))
+            f.write(zlib.compress(bytes(self.inputs), 9))
+        os.replace(temp_path, self.path)
+        print(f"Recorded {self.ticks} ticks to {self.path}")
+
+class Replay:
+    """A recorded session loaded back from a replay file"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version = struct.unpack_from('<4sH', data)  # Checked first: older headers are shorter
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay file")
+        _, _, self.seed, self.ticks, point_count, flags, self.levels_digest = REPLAY_HEADER.unpack_from(data)
+        self.swarm = bool(flags & REPLAY_FLAG_SWARM)
+        offset = REPLAY_HEADER.size
+        self.trajectory = [REPLAY_POINT.unpack_from(data, offset + i * REPLAY_POINT.size)
+                           for i in range(point_count)]
+        self.inputs = zlib.decompress(data[offset + point_count * REPLAY_POINT.size:])
+    
+    def __iter__(self):
+        """Yield (held keys, actions) for each recorded tick"""
+        inputs = self.inputs
+        position = 0
+        while position < len(inputs):
+            mask = inputs[position]
+            position += 1
+            actions = b''
+            if mask & REPLAY_HAS_ACTIONS:
+                count = inputs[position]
+                actions = inputs[position + 1:position + 1 + count]
+                position += 1 + count
+            held = set()
+            if mask & REPLAY_KEY_LEFT:
+                held.add(pygame.K_LEFT)
+            if mask & REPLAY_KEY_RIGHT:
+                held.add(pygame.K_RIGHT)
+            if mask & REPLAY_KEY_FIRE:
+                held.add(pygame.K_SPACE)
+            yield held, actions
+
+def geometric_delay(chance):
+    """Ticks until the first success of a per-tick chance, drawn from its geometric distribution
+    
+    A chance of 0 or less never succeeds (None); 1 or more succeeds on the next tick.
+    """
+    if chance <= 0:
+        return None
+    if chance >= 1:
+        return 1
+    return 1 + int(math.log(1.0 - random.random()) / math.log(1.0 - chance))
 
 class Game:
     """Main game class"""
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Space Shooter - Enhanced Edition")
+    def __init__(self, headless=False, seed=None, dirty_rects=True, profile_path=None, record_path=None,
+                 startup_timer=None, levels=None, swarm=False):
+        # Headless mode runs the simulation without a window, audio or frame limiting
+        self.headless = headless
+        if seed is None and record_path:
+            # A recording is only replayable from a known seed
+            seed = random.getrandbits(64)
+        self.seed = seed
+        if seed is not None:
+            random.seed(seed)
+        # Difficulty tables, identified in recordings so replays can check they use the same file
+        self.levels = levels or LevelTable()
+        self.recorder = InputRecorder(record_path, seed, swarm, self.levels.digest) if record_path else None
+        
+        if headless:
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Space Shooter - Enhanced Edition")
+            if startup_timer:
+                startup_timer.lap('window')
         self.clock = pygame.time.Clock()
+        self.renderer = DirtyRectRenderer(self.screen, headless=headless, enabled=dirty_rects)
         self.font = pygame.font.Font(None, 36)
         self.big_font = pygame.font.Font(None, 72)
         self.small_font = pygame.font.Font(None, 24)
+        self.hud = Hud(TextCache())
+        self.profiler = FrameProfiler(export_path=profile_path)
+        self.profiler_font = pygame.font.Font(None, 20)
         
         # Initialize audio
         self.sounds = {}
-        self.audio_enabled = ENABLE_AUDIO
-        self.music_channel = None
+        self.audio_enabled = not headless and pygame.mixer.get_init() is not None
+        self.music = None
         self.music_playing = False
         
+        self.audio_loader = None
+        self.audio = AudioManager(self.sounds) if self.audio_enabled else None
+        
         if self.audio_enabled:
+            # Sounds attach as the background loader finishes them
             print("Loading audio...")
-            self.sounds = create_audio_effects()
-            
-            # Start background music if available
-            if 'music' in self.sounds:
-                self.music_channel = pygame.mixer.Channel(0)
-                self.music_channel.play(self.sounds['music'], loops=-1)
-                self.music_channel.set_volume(0.2)  # Lower volume for background
-                self.music_playing = True
-                print("Background music started!")
+            self.audio_loader = AudioLoader(pygame.mixer.get_init()[0])
             
-            if self.sounds:
-                print(f"Sound effects loaded: {list(self.sounds.keys())}")
+            # Music is streamed as it is synthesized, so it can start right away
+            self.music = MusicStream(self.audio.music_channel, pygame.mixer.get_init()[0])
+            self.music.play()
+            self.music_playing = True
         
         # Game state
         self.running = True
@@ -555,442 +2268,834 @@ class Game:
         self.level = 1
         self.previous_level = 1
         
+        # The current level's parameters are only looked up again on level up
+        self.params = self.levels.params[1]
+        self.next_level_score = self.levels.next_threshold(1)
+        
+        # Spawns, enemy turns and shots and power-up expiry are timers on the simulation tick
+        self.timers = TimerWheel()
+        
         # Game objects
-        self.player = Player(SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2, SCREEN_HEIGHT - PLAYER_HEIGHT - 10)
-        self.bullets = []
-        self.asteroids = []
-        self.powerups = []
-        self.enemy_ships = []
-        self.enemy_bullets = []
-        self.particles = []
-        self.asteroid_spawn_timer = 0
+        self.player = Player(SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2, SCREEN_HEIGHT - PLAYER_HEIGHT - 10, self.timers)
+        self.bullets = BulletStore()
+        self.asteroids = AsteroidStore(self.levels)
+        self.powerups = PowerUpStore()
+        self.enemy_ships = (SwarmShipStore if swarm else EnemyShipStore)(self.timers, self.levels)
+        self.enemy_bullets = EnemyBulletStore()
+        self.particles = ParticleSystem(seed=random.getrandbits(32))
+        self.asteroid_spawn = None
+        self.enemy_spawn = None
+        self.last_asteroid_spawn = 0
+        self.schedule_spawns()
+        self.powerup_spawn = None
+        self.schedule_powerup()
         
         # Visual effects
-        self.stars = [(random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGHT)) for _ in range(50)]
+        self.stars = StarField(seed=random.getrandbits(32))
         
         # Level system
-        self.level_up_timer = 0  # Timer for level up display
+        self.level_up_timer = None  # Hides the level up display when it expires
         self.show_level_up = False
+        
+        # Keyboard and window events
+        self.input = InputDispatcher({
+            'quit': self.on_quit,
+            'repaint': self.on_repaint,
+            'fire': self.on_fire,
+            'restart': self.on_restart,
+            'toggle_music': self.on_toggle_music,
+            'toggle_profiler': self.on_toggle_profiler,
+        })
+        if not headless:
+            self.input.filter_events()
+        
+        # Keys held down by the headless pilot, and the pilot's own randomness: the replay runner
+        # doesn't call pilots, so they must never draw from the simulation's seeded stream
+        self.held_keys = set()
+        self.pilot_rng = random.Random(None if seed is None else f"pilot {seed}")
+        
+        # Fixed-timestep loop state
+        self.alpha = 1.0  # How far rendering is between the previous and current tick
+        self.frame_ticks = 1.0  # Simulation ticks covered by the frame being drawn
+        self.dropped_ticks = 0
+        
+        self.startup_timer = startup_timer
+        if startup_timer:
+            startup_timer.lap('game')
     
     def get_current_level(self):
-        """Calculate current level based on score"""
-        return min(MAX_LEVEL, (self.score // POINTS_PER_LEVEL) + 1)
+        """Level reached by the current score (self.level catches up at the start of the next tick)"""
+        return self.levels.level_for(self.score)
+    
+    def schedule_enemy_spawn(self):
+        """Schedule the next enemy ship, unless this level has no enemies"""
+        delay = geometric_delay(self.params['enemy_spawn_chance'])
+        self.enemy_spawn = None if delay is None else self.timers.schedule(delay, self.spawn_enemy_ship)
     
-    def get_spawn_rate(self):
-        """Get asteroid spawn rate based on current level"""
-        # Spawn rate decreases (more frequent) as level increases
-        level = self.get_current_level()
-        spawn_rate = max(10, ASTEROID_BASE_SPAWN_RATE - (level - 1) * 2)  # Minimum spawn rate of 10
-        return spawn_rate
+    def schedule_spawns(self):
+        """(Re)schedule the next asteroid and enemy ship for the current level"""
+        timers = self.timers
+        timers.cancel(self.asteroid_spawn)
+        next_asteroid = max(timers.tick + 1, self.last_asteroid_spawn + self.params['asteroid_spawn_interval'])
+        self.asteroid_spawn = timers.schedule(next_asteroid - timers.tick, self.spawn_asteroid)
+        # Waits are memoryless, so a fresh draw at the new level keeps the distribution exact
+        timers.cancel(self.enemy_spawn)
+        self.schedule_enemy_spawn()
+    
+    def schedule_powerup(self):
+        """(Re)schedule the next power-up, unless power-ups are turned off"""
+        self.timers.cancel(self.powerup_spawn)
+        delay = geometric_delay(POWERUP_SPAWN_CHANCE)
+        self.powerup_spawn = None if delay is None else self.timers.schedule(delay, self.spawn_powerup)
+    
+    def spawn_powerup(self):
+        """Power-up spawn timer expired: spawn one of a weighted random type and schedule the next"""
+        self.powerups.spawn_random(random.randint(0, SCREEN_WIDTH - POWERUP_WIDTH), -POWERUP_HEIGHT)
+        self.schedule_powerup()
+    
+    def spawn_asteroid(self):
+        """Asteroid spawn timer expired: spawn one and schedule the next"""
+        asteroid_x = random.randint(0, SCREEN_WIDTH - ASTEROID_WIDTH)
+        # Pass current level to asteroid constructor
+        self.asteroids.spawn(asteroid_x, -ASTEROID_HEIGHT, self.level)
+        self.last_asteroid_spawn = self.timers.tick
+        self.asteroid_spawn = self.timers.schedule(self.params['asteroid_spawn_interval'], self.spawn_asteroid)
+    
+    def spawn_enemy_ship(self):
+        """Enemy spawn timer expired: spawn one and schedule the next"""
+        enemy_x = random.randint(0, SCREEN_WIDTH - ENEMY_SHIP_WIDTH)
+        self.enemy_ships.spawn(enemy_x, -ENEMY_SHIP_HEIGHT, self.level)
+        self.schedule_enemy_spawn()
+    
+    def set_level(self, level):
+        """Switch to a level's precomputed parameters"""
+        self.level = level
+        self.params = self.levels.params[level]
+        self.next_level_score = self.levels.next_threshold(level)
+    
+    def hide_level_up(self):
+        """Level up display timer expired"""
+        self.show_level_up = False
+        self.level_up_timer = None
     
     def check_level_up(self):
-        """Check if player has leveled up"""
-        current_level = self.get_current_level()
-        if current_level > self.level:
-            self.level = current_level
+        """Check if player has leveled up (the score is only compared against the next threshold)"""
+        if self.score >= self.next_level_score:
+            self.set_level(self.levels.level_for(self.score))
             self.show_level_up = True
-            self.level_up_timer = 120  # Show level up message for 2 seconds at 60 FPS
+            self.timers.cancel(self.level_up_timer)
+            self.level_up_timer = self.timers.schedule(LEVEL_UP_BANNER_TICKS, self.hide_level_up)
+            self.schedule_spawns()
             
             # Play a special sound for level up (reuse explosion sound with different volume)
-            if self.audio_enabled and 'explosion' in self.sounds:
-                level_up_channel = pygame.mixer.Channel(4)
-                level_up_channel.play(self.sounds['explosion'])
-                level_up_channel.set_volume(0.3)  # Quieter for level up
+            if self.audio:
+                self.audio.play('level_up')
             
             print(f"Level Up! Now at Level {self.level}")
             return True
         return False
     
-    def handle_events(self):
-        """Handle all game events"""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if (event.key == pygame.K_SPACE or event.key == pygame.K_s) and not self.game_over:  # Add support for 'S' key
-                    # Shoot bullet
-                    bullet_x = self.player.x + self.player.width // 2 - BULLET_WIDTH // 2
-                    bullet_y = self.player.y
-                    self.bullets.append(Bullet(bullet_x, bullet_y))
-                    
-                    # Play shooting sound
-                    if self.audio_enabled and 'shoot' in self.sounds:
-                        shoot_channel = pygame.mixer.Channel(1)
-                        shoot_channel.play(self.sounds['shoot'])
-                        shoot_channel.set_volume(0.4)
-                        
-                elif event.key == pygame.K_r and self.game_over:
-                    # Restart game
-                    self.restart_game()
-                elif event.key == pygame.K_m:
-                    # Toggle music
-                    if self.music_channel and 'music' in self.sounds:
-                        if self.music_playing:
-                            self.music_channel.stop()
-                            self.music_playing = False
-                            print("Music stopped")
-                        else:
-                            self.music_channel.play(self.sounds['music'], loops=-1)
-                            self.music_channel.set_volume(0.2)
-                            self.music_playing = True
-                            print("Music started")
-        """Handle all game events"""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if (event.key == pygame.K_SPACE or event.key == pygame.K_d) and not self.game_over:  # Add support for 'D' key
-                    # Shoot bullet
-                    bullet_x = self.player.x + self.player.width // 2 - BULLET_WIDTH // 2
-                    bullet_y = self.player.y
-                    self.bullets.append(Bullet(bullet_x, bullet_y))
-                    
-                    # Play shooting sound
-                    if self.audio_enabled and 'shoot' in self.sounds:
-                        shoot_channel = pygame.mixer.Channel(1)
-                        shoot_channel.play(self.sounds['shoot'])
-                        shoot_channel.set_volume(0.4)
-                        
-                elif event.key == pygame.K_r and self.game_over:
-                    # Restart game
-                    self.restart_game()
-                elif event.key == pygame.K_m:
-                    # Toggle music
-                    if self.music_channel and 'music' in self.sounds:
-                        if self.music_playing:
-                            self.music_channel.stop()
-                            self.music_playing = False
-                            print("Music stopped")
-                        else:
-                            self.music_channel.play(self.sounds['music'], loops=-1)
-                            self.music_channel.set_volume(0.2)
-                            self.music_playing = True
-                            print("Music started")
+    def attach_ready_sounds(self):
+        """Turn sound buffers finished by the background loader into playable sounds"""
+        for name, samples in self.audio_loader.poll():
+            self.sounds[name] = pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+        
+        if self.audio_loader.done:
+            self.audio_loader = None
+            print(f"Sound effects loaded: {list(self.sounds.keys())}")
+    
+    def fire_bullet(self, record=True):
+        """Shoot a bullet from the player's position, unless the shot cooldown is still running
+        
+        Shots are recorded as replay actions unless they come from a held fire key, which is
+        recorded with the movement keys instead.
+        """
+        if not self.player.can_shoot():
+            return
+        self.player.shoot()
+        bullet_x = self.player.x + self.player.width // 2 - BULLET_WIDTH // 2
+        bullet_y = self.player.y
+        self.bullets.spawn(bullet_x, bullet_y)
+        if self.recorder and record:
+            self.recorder.action(REPLAY_ACTION_FIRE)
+        
+        # Play shooting sound
+        if self.audio:
+            self.audio.play('shoot')
+    
+    def get_pressed_keys(self):
+        """Get the continuous key state from the keyboard or the headless pilot"""
+        if self.headless:
+            return SimulatedKeys(self.held_keys)
+        return pygame.key.get_pressed()
+    
+    def on_quit(self):
+        """Stop the main loop"""
+        self.running = False
+    
+    def on_repaint(self):
+        """The window contents were lost - repaint everything"""
+        self.renderer.force_full = True
+    
+    def on_fire(self):
+        """Fire key pressed"""
+        if not self.game_over:
+            self.fire_bullet()
+    
+    def on_restart(self):
+        """Restart key pressed"""
+        if self.game_over:
+            self.restart_game()
+    
+    def on_toggle_music(self):
+        """Start or stop the background music"""
+        if self.music:
+            if self.music_playing:
+                self.music.stop()
+                self.music_playing = False
+                print("Music stopped")
+            else:
+                self.music.play()
+                self.music_playing = True
+                print("Music started")
+    
+    def on_toggle_profiler(self):
+        """Show or hide the profiler overlay"""
+        self.profiler.show_overlay = not self.profiler.show_overlay
+    
+    def tick(self):
+        """Advance the simulation by one fixed step, recording its input when a recorder is attached"""
+        if self.recorder:
+            self.recorder.record_tick(self.get_pressed_keys())
+        self.update()
+        if self.recorder:
+            self.recorder.record_progress(self.score, self.level)
     
     def update(self):
         """Update game state"""
+        lap = self.profiler.lap
         if self.game_over:
             # Update particles even when game over
-            for particle in self.particles[:]:
-                particle.update()
-                if not particle.is_alive():
-                    self.particles.remove(particle)
-            
-            # Update level up timer
-            if self.show_level_up:
-                self.level_up_timer -= 1
-                if self.level_up_timer <= 0:
-                    self.show_level_up = False
+            self.particles.update()
+            lap('update.particles')
             return
         
         # Check for level up
         self.check_level_up()
         
-        # Update level up display timer
-        if self.show_level_up:
-            self.level_up_timer -= 1
-            if self.level_up_timer <= 0:
-                self.show_level_up = False
-        
         # Handle continuous key presses
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:  # Add support for 'A' key
+        self.player.prev_x = self.player.x
+        keys = self.get_pressed_keys()
+        if any(keys[key] for key in MOVE_LEFT_KEYS):
             self.player.move_left()
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:  # Add support for 'D' key
+        if any(keys[key] for key in MOVE_RIGHT_KEYS):
             self.player.move_right()
         
         # Update bullets
-        for bullet in self.bullets[:]:
-            bullet.update()
-            if bullet.is_off_screen():
-                self.bullets.remove(bullet)
-        
-        # Spawn asteroids based on current level
-        self.asteroid_spawn_timer += 1
-        current_spawn_rate = self.get_spawn_rate()
-        if self.asteroid_spawn_timer >= current_spawn_rate:
-            asteroid_x = random.randint(0, SCREEN_WIDTH - ASTEROID_WIDTH)
-            # Pass current level to asteroid constructor
-            self.asteroids.append(Asteroid(asteroid_x, -ASTEROID_HEIGHT, self.get_current_level()))
-            self.asteroid_spawn_timer = 0
-        
-        # Spawn enemy ships occasionally
-        if random.random() < ENEMY_SHIP_SPAWN_CHANCE * (1 + self.get_current_level() * 0.2):
-            enemy_x = random.randint(0, SCREEN_WIDTH - ENEMY_SHIP_WIDTH)
-            self.enemy_ships.append(EnemyShip(enemy_x, -ENEMY_SHIP_HEIGHT, self.get_current_level()))
+        self.bullets.update()
+        self.bullets.cull()
+        lap('update.movement')
+        
+        # Run the timers expiring this tick: spawns, enemy turns and shots, power-up and display expiry
+        # (the simulation clock stops while the game is over)
+        self.timers.advance()
+        lap('update.timers')
+        
+        # Holding a fire key keeps shooting as fast as the cooldown (just ended above) allows
+        if any(keys[key] for key in FIRE_KEYS):
+            self.fire_bullet(record=False)
         
         # Update asteroids
-        for asteroid in self.asteroids[:]:
-            asteroid.update()
-            if asteroid.is_off_screen():
-                self.asteroids.remove(asteroid)
+        self.asteroids.update()
+        self.asteroids.cull()
         
         # Update enemy ships and handle their shooting
-        for enemy in self.enemy_ships[:]:
-            enemy.update()
-            if enemy.is_off_screen():
-                self.enemy_ships.remove(enemy)
-            elif enemy.can_shoot():
-                # Enemy shoots at player
-                enemy_bullet = enemy.shoot()
-                self.enemy_bullets.append(enemy_bullet)
+        self.enemy_ships.update()
+        self.enemy_ships.cull()
+        self.enemy_ships.shoot(self.enemy_bullets, self.player)
         
         # Update enemy bullets
-        for enemy_bullet in self.enemy_bullets[:]:
-            enemy_bullet.update()
-            if enemy_bullet.is_off_screen():
-                self.enemy_bullets.remove(enemy_bullet)
+        self.enemy_bullets.update()
+        self.enemy_bullets.cull()
+        
+        # Update power-ups
+        self.powerups.update()
+        self.powerups.cull()
+        lap('update.movement')
         
         # Update particles
-        for particle in self.particles[:]:
-            particle.update()
-            if not particle.is_alive():
-                self.particles.remove(particle)
-        
-        # Check bullet-asteroid collisions
-        for bullet in self.bullets[:]:
-            for asteroid in self.asteroids[:]:
-                if bullet.rect.colliderect(asteroid.rect):
-                    # Create explosion particles
-                    for _ in range(8):
-                        self.particles.append(Particle(asteroid.x + asteroid.width // 2, 
-                                                     asteroid.y + asteroid.height // 2))
-                    
-                    self.bullets.remove(bullet)
-                    self.asteroids.remove(asteroid)
-                    
-                    # Score increases based on asteroid level
-                    points = 10 * asteroid.level  # Higher level asteroids give more points
-                    self.score += points
-                    
-                    # Play explosion sound
-                    if self.audio_enabled and 'explosion' in self.sounds:
-                        explosion_channel = pygame.mixer.Channel(2)
-                        explosion_channel.play(self.sounds['explosion'])
-                        explosion_channel.set_volume(0.6)
-                    break
+        self.particles.update()
+        lap('update.particles')
+        
+        # Check bullet-asteroid collisions (each bullet takes the first asteroid it overlaps)
+        bullet_rows, asteroid_rows = aabb_first_hits(self.bullets.boxes(), self.asteroids.boxes())
+        if len(bullet_rows):
+            # Create explosion particles
+            for x, y in zip(*self.asteroids.centers(asteroid_rows)):
+                self.particles.emit(x, y, 8)
+            
+            # Score increases based on asteroid level
+            self.score += int(self.levels.asteroid_points[self.asteroids.level[asteroid_rows]].sum())  # Higher level asteroids give more points
+            self.bullets.remove_rows(bullet_rows)
+            self.asteroids.remove_rows(asteroid_rows)
+            
+            # Play explosion sound
+            if self.audio:
+                self.audio.play('asteroid_explosion')
+        lap('update.collide_bullet_asteroid')
         
         # Check bullet-enemy ship collisions
-        for bullet in self.bullets[:]:
-            for enemy in self.enemy_ships[:]:
-                if bullet.rect.colliderect(enemy.rect):
-                    # Create explosion particles
-                    for _ in range(6):
-                        self.particles.append(Particle(enemy.x + enemy.width // 2, 
-                                                     enemy.y + enemy.height // 2))
-                    
-                    self.bullets.remove(bullet)
-                    self.enemy_ships.remove(enemy)
-                    
-                    # Enemy ships give more points than asteroids
-                    points = 25 * enemy.level
-                    self.score += points
-                    
-                    # Play explosion sound
-                    if self.audio_enabled and 'explosion' in self.sounds:
-                        explosion_channel = pygame.mixer.Channel(2)
-                        explosion_channel.play(self.sounds['explosion'])
-                        explosion_channel.set_volume(0.7)
-                    break
+        bullet_rows, enemy_rows = aabb_first_hits(self.bullets.boxes(), self.enemy_ships.boxes())
+        if len(bullet_rows):
+            # Create explosion particles
+            for x, y in zip(*self.enemy_ships.centers(enemy_rows)):
+                self.particles.emit(x, y, 6)
+            
+            # Enemy ships give more points than asteroids
+            self.score += int(self.levels.enemy_points[self.enemy_ships.level[enemy_rows]].sum())
+            self.bullets.remove_rows(bullet_rows)
+            self.enemy_ships.remove_rows(enemy_rows)
+            
+            # Play explosion sound
+            if self.audio:
+                self.audio.play('enemy_explosion')
+        lap('update.collide_bullet_enemy')
         
-        # Check enemy bullet-player collisions
-        for enemy_bullet in self.enemy_bullets[:]:
-            if enemy_bullet.rect.colliderect(self.player.rect):
-                self.enemy_bullets.remove(enemy_bullet)
-                
-                # Player takes damage (check shield)
-                if self.player.take_damage():
-                    # Create big explosion
-                    for _ in range(15):
-                        self.particles.append(Particle(self.player.x + self.player.width // 2, 
-                                                     self.player.y + self.player.height // 2))
-                    
-                    self.game_over = True
-                    if self.score > self.high_score:
-                        self.high_score = self.score
-                    
-                    # Play explosion sound for game over
-                    if self.audio_enabled and 'explosion' in self.sounds:
-                        game_over_channel = pygame.mixer.Channel(3)
-                        game_over_channel.play(self.sounds['explosion'])
-                        game_over_channel.set_volume(1.0)
-                    
-                    # Stop background music when game over
-                    if self.music_channel and self.music_playing:
-                        self.music_channel.stop()
-                        self.music_playing = False
-                else:
-                    # Shield absorbed the hit - create small explosion
-                    for _ in range(5):
-                        self.particles.append(Particle(self.player.x + self.player.width // 2, 
-                                                     self.player.y + self.player.height // 2))
-                break
+        # Check player-power-up pickups (every power-up the player touches is collected)
+        _, powerup_rows = aabb_overlap_pairs(self.player.box(), self.powerups.boxes())
+        if len(powerup_rows):
+            for kind in self.powerups.kind[powerup_rows].tolist():
+                self.player.add_effect(PowerUpStore.TYPES[kind])
+            self.powerups.remove_rows(powerup_rows)
+            
+            # Play pickup sound
+            if self.audio:
+                self.audio.play('pickup')
+        lap('update.collide_player_powerup')
         
-        # Check player-asteroid collisions
-        for asteroid in self.asteroids:
-            if self.player.rect.colliderect(asteroid.rect):
+        # Check enemy bullet-player collisions (the first overlapping bullet hits)
+        hits = np.flatnonzero(self.enemy_bullets.overlaps(self.player.rect))
+        if len(hits):
+            self.enemy_bullets.remove_rows(hits[:1])
+            
+            # Player takes damage (check shield)
+            if self.player.take_damage():
                 # Create big explosion
-                for _ in range(15):
-                    self.particles.append(Particle(self.player.x + self.player.width // 2, 
-                                                 self.player.y + self.player.height // 2))
+                self.particles.emit(self.player.x + self.player.width // 2,
+                                    self.player.y + self.player.height // 2, 15)
                 
                 self.game_over = True
                 if self.score > self.high_score:
                     self.high_score = self.score
                 
                 # Play explosion sound for game over
-                if self.audio_enabled and 'explosion' in self.sounds:
-                    game_over_channel = pygame.mixer.Channel(3)
-                    game_over_channel.play(self.sounds['explosion'])
-                    game_over_channel.set_volume(1.0)
+                if self.audio:
+                    self.audio.play('game_over')
                 
                 # Stop background music when game over
-                if self.music_channel and self.music_playing:
-                    self.music_channel.stop()
+                if self.music and self.music_playing:
+                    self.music.stop()
                     self.music_playing = False
+            else:
+                # Shield absorbed the hit - create small explosion
+                self.particles.emit(self.player.x + self.player.width // 2,
+                                    self.player.y + self.player.height // 2, 5)
+        lap('update.collide_enemy_bullet_player')
+        
+        # Check player-asteroid collisions
+        if self.asteroids.overlaps(self.player.rect).any():
+            # Create big explosion
+            self.particles.emit(self.player.x + self.player.width // 2,
+                                self.player.y + self.player.height // 2, 15)
+            
+            self.game_over = True
+            if self.score > self.high_score:
+                self.high_score = self.score
+            
+            # Play explosion sound for game over
+            if self.audio:
+                self.audio.play('game_over')
+            
+            # Stop background music when game over
+            if self.music and self.music_playing:
+                self.music.stop()
+                self.music_playing = False
+        lap('update.collide_player_asteroid')
     
     def draw_stars(self):
         """Draw scrolling star field"""
-        for i, (x, y) in enumerate(self.stars):
-            pygame.draw.circle(self.screen, WHITE, (x, y), 1)
-            # Move stars down slowly
-            self.stars[i] = (x, (y + 1) % SCREEN_HEIGHT)
+        # Only stars that moved to a new pixel row change the screen; they erase their own
+        # old pixels, so they go straight to the display instead of dirtying whole tiles
+        star_x, old_y, new_y = self.stars.draw(self.screen)
+        self.renderer.push_points(np.concatenate([star_x, star_x]), np.concatenate([old_y, new_y]), 1)
+        # Move stars down slowly (by however many ticks this frame covers)
+        self.stars.scroll(self.frame_ticks)
+    
+    def draw_particles(self):
+        """Draw the explosion particles"""
+        self.particles.draw(self.screen)
+        count = len(self.particles)
+        self.renderer.mark_points(self.particles.x[:count], self.particles.y[:count], PARTICLE_MAX_RADIUS)
+    
+    def hud_items(self):
+        """Get the in-game HUD text: score, level, high score, difficulty, instructions and music status"""
+        items = [
+            (self.font, f"Score: {self.score}", WHITE, 'topleft', (10, 10)),
+            (self.font, f"Level: {self.level}", GREEN, 'topleft', (10, 50)),
+            (self.small_font, f"High Score: {self.high_score}", YELLOW, 'topleft', (10, 90)),
+            # Display difficulty info
+            (self.small_font, f"Spawn Rate: {self.params['asteroid_spawn_interval']} | "
+                              f"Speed: x{self.params['asteroid_speed_multiplier']:.1f}",
+             WHITE, 'topleft', (10, 120)),
+            # Instructions
+            (self.small_font, "Arrow Keys: Move | Space: Shoot | M: Toggle Music", WHITE,
+             'topleft', (10, SCREEN_HEIGHT - 30)),
+        ]
+        # Active power-ups and their stack counts
+        effects = " | ".join(f"{kind.replace('_', ' ').title()} x{len(stacks)}"
+                             for kind, stacks in self.player.effects.items() if stacks)
+        if effects:
+            items.append((self.small_font, effects, ORANGE, 'topleft', (10, 145)))
+        if self.audio_enabled:
+            music_status = "Music: ON" if self.music_playing else "Music: OFF"
+            items.append((self.small_font, music_status, GREEN if self.music_playing else RED,
+                          'topleft', (SCREEN_WIDTH - 100, 10)))
+        return items
+    
+    def game_over_items(self):
+        """Get the game over screen text"""
+        return [
+            (self.big_font, "GAME OVER", RED, 'center', (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80)),
+            (self.font, f"Final Score: {self.score}", WHITE, 'center', (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30)),
+            (self.font, f"High Score: {self.high_score}", YELLOW, 'center', (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)),
+            (self.font, "Press R to Restart or Close Window to Quit", WHITE, 'center',
+             (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)),
+        ]
     
     def draw(self):
         """Draw all game objects"""
-        # Clear screen
-        self.screen.fill(BLACK)
+        lap = self.profiler.lap
+        
+        # Erase last frame's drawing
+        self.renderer.begin_frame()
+        mark = self.renderer.mark
+        lap('draw.clear')
         
         # Draw star field
         self.draw_stars()
+        lap('draw.stars')
         
         if not self.game_over:
             # Draw game objects
-            self.player.draw(self.screen)
-            
-            for bullet in self.bullets:
-                bullet.draw(self.screen)
-            
-            for asteroid in self.asteroids:
-                asteroid.draw(self.screen)
+            # Positions are interpolated between the last two simulation ticks
+            alpha = self.alpha
+            mark(self.player.draw(self.screen, alpha))
             
-            for enemy in self.enemy_ships:
-                enemy.draw(self.screen)
-            
-            for enemy_bullet in self.enemy_bullets:
-                enemy_bullet.draw(self.screen)
+            # Each kind is drawn with one batched blit
+            for store in (self.bullets, self.asteroids, self.powerups, self.enemy_ships, self.enemy_bullets):
+                for rect in store.draw(self.screen, alpha):
+                    mark(rect)
+            lap('draw.entities')
             
             # Draw particles
-            for particle in self.particles:
-                particle.draw(self.screen)
-            
-            # Draw score, level, and high score
-            score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-            level_text = self.font.render(f"Level: {self.get_current_level()}", True, GREEN)
-            high_score_text = self.small_font.render(f"High Score: {self.high_score}", True, YELLOW)
+            self.draw_particles()
+            lap('draw.particles')
             
-            # Display difficulty info
-            spawn_rate = self.get_spawn_rate()
-            difficulty_text = self.small_font.render(f"Spawn Rate: {spawn_rate} | Speed: x{1 + (self.get_current_level() - 1) * 0.3:.1f}", True, WHITE)
-            
-            self.screen.blit(score_text, (10, 10))
-            self.screen.blit(level_text, (10, 50))
-            self.screen.blit(high_score_text, (10, 90))
-            self.screen.blit(difficulty_text, (10, 120))
+            # Draw the HUD (text is only re-rendered when it changes)
+            for rect in self.hud.draw(self.screen, self.hud_items()):
+                mark(rect)
             
             # Draw level up message
             if self.show_level_up:
-                level_up_text = self.big_font.render(f"LEVEL {self.level}!", True, YELLOW)
-                level_up_rect = level_up_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-                
-                # Add a semi-transparent background
-                overlay = pygame.Surface((level_up_text.get_width() + 40, level_up_text.get_height() + 20))
-                overlay.set_alpha(180)
-                overlay.fill(BLACK)
-                overlay_rect = overlay.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-                self.screen.blit(overlay, overlay_rect)
-                self.screen.blit(level_up_text, level_up_rect)
-            
-            # Draw instructions
-            instruction_text = self.small_font.render("Arrow Keys: Move | Space: Shoot | M: Toggle Music", True, WHITE)
-            self.screen.blit(instruction_text, (10, SCREEN_HEIGHT - 30))
-            
-            # Draw music status
-            if self.audio_enabled:
-                music_status = "Music: ON" if self.music_playing else "Music: OFF"
-                music_text = self.small_font.render(music_status, True, GREEN if self.music_playing else RED)
-                self.screen.blit(music_text, (SCREEN_WIDTH - 100, 10))
+                mark(self.hud.draw_banner(self.screen, self.big_font, f"LEVEL {self.level}!", YELLOW,
+                                          (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+            lap('draw.hud')
         
         else:
             # Draw particles
-            for particle in self.particles:
-                particle.draw(self.screen)
+            self.draw_particles()
+            lap('draw.particles')
             
             # Draw game over screen
-            game_over_text = self.big_font.render("GAME OVER", True, RED)
-            final_score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
-            high_score_text = self.font.render(f"High Score: {self.high_score}", True, YELLOW)
-            restart_text = self.font.render("Press R to Restart or Close Window to Quit", True, WHITE)
-            
-            # Center the text
-            game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80))
-            score_rect = final_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
-            high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
-            
-            self.screen.blit(game_over_text, game_over_rect)
-            self.screen.blit(final_score_text, score_rect)
-            self.screen.blit(high_score_text, high_score_rect)
-            self.screen.blit(restart_text, restart_rect)
+            for rect in self.hud.draw(self.screen, self.game_over_items()):
+                mark(rect)
+            lap('draw.hud')
         
-        # Update display
-        pygame.display.flip()
+        # Draw the profiler overlay if it is toggled on
+        overlay_rect = self.profiler.draw_overlay(self.screen, self.profiler_font)
+        if overlay_rect:
+            mark(overlay_rect)
+            lap('draw.profiler')
+        
+        # Update display (only the regions that changed)
+        self.renderer.end_frame()
+        lap('draw.flip')
     
     def restart_game(self):
         """Restart the game"""
+        if self.recorder:
+            self.recorder.action(REPLAY_ACTION_RESTART)
         self.game_over = False
         self.score = 0
-        self.level = 1
+        self.set_level(1)
         self.previous_level = 1
         self.show_level_up = False
-        self.level_up_timer = 0
-        self.player = Player(SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2, SCREEN_HEIGHT - PLAYER_HEIGHT - 10)
-        self.bullets = []
-        self.asteroids = []
-        self.particles = []
-        self.asteroid_spawn_timer = 0
+        self.timers.cancel(self.level_up_timer)
+        self.level_up_timer = None
+        self.player.clear_effects()
+        self.player = Player(SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2, SCREEN_HEIGHT - PLAYER_HEIGHT - 10, self.timers)
+        self.bullets.clear()
+        self.asteroids.clear()
+        self.powerups.clear()
+        self.particles.clear()
+        self.last_asteroid_spawn = self.timers.tick
+        self.schedule_spawns()
+        self.schedule_powerup()
         
         # Restart background music
-        if self.audio_enabled and 'music' in self.sounds and self.music_channel:
-            self.music_channel.play(self.sounds['music'], loops=-1)
-            self.music_channel.set_volume(0.2)
+        if self.music:
+            self.music.play()
             self.music_playing = True
     
+    def store_stats(self):
+        """Get the peak size and capacity of each entity store"""
+        return {name: {'high_water': store.high_water, 'capacity': store.capacity}
+                for name, store in (('bullets', self.bullets), ('asteroids', self.asteroids),
+                                    ('enemy_ships', self.enemy_ships), ('enemy_bullets', self.enemy_bullets),
+                                    ('powerups', self.powerups))}
+    
+    def entity_counts(self):
+        """Get the number of live entities of each kind"""
+        return {
+            'bullets': len(self.bullets),
+            'asteroids': len(self.asteroids),
+            'enemy_ships': len(self.enemy_ships),
+            'enemy_bullets': len(self.enemy_bullets),
+            'powerups': len(self.powerups),
+            'particles': len(self.particles),
+        }
+    
     def run(self):
-        """Main game loop"""
+        """Main game loop: fixed-rate simulation ticks, rendering as fast as the display allows"""
+        accumulator = 0.0
+        previous_time = time.perf_counter()
         while self.running:
-            self.handle_events()
-            self.update()
+            now = time.perf_counter()
+            # Clamp long stalls so we never try to simulate them all at once
+            frame_time = min(now - previous_time, MAX_FRAME_TIME)
+            previous_time = now
+            accumulator += frame_time
+            
+            self.profiler.begin_frame()
+            if self.audio_loader:
+                self.attach_ready_sounds()
+            if self.music:
+                self.music.pump(self.level)
+            self.input.poll()
+            self.profiler.lap('events')
+            
+            ticks = 0
+            while accumulator >= TICK_TIME and ticks < MAX_CATCH_UP_TICKS:
+                self.tick()
+                accumulator -= TICK_TIME
+                ticks += 1
+            if accumulator >= TICK_TIME:
+                # Too far behind - drop the backlog instead of spiralling
+                self.dropped_ticks += int(accumulator / TICK_TIME)
+                accumulator %= TICK_TIME
+            
+            self.alpha = accumulator / TICK_TIME
+            self.frame_ticks = frame_time / TICK_TIME
             self.draw()
-            self.clock.tick(FPS)
+            self.input.present(ticks)
+            if self.startup_timer:
+                self.startup_timer.lap('first_frame')
+                self.startup_timer.report()
+                self.startup_timer = None
+            counts = self.entity_counts()
+            counts['ticks'] = ticks
+            if self.audio:
+                counts['voices'] = self.audio.active_voices()
+            if self.music:
+                counts['music_underruns'] = self.music.underruns
+            self.profiler.end_frame(counts)
+            self.clock.tick(MAX_RENDER_FPS)
+        self.profiler.close()
+        if self.recorder:
+            self.recorder.close()
+        latency = self.input.latency_percentiles()
+        if latency:
+            print(f"Input latency over {latency['inputs']} presses: p50 {latency['p50']:.1f} ms, "
+                  f"p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms")
         
         # Clean up audio
-        if self.audio_enabled:
+        if self.music:
+            print(f"Music: {self.music.underruns} buffer underruns")
+            self.music.close()
+        if self.audio:
+            stats = self.audio.stats()
+            print(f"Audio: {stats['plays']} plays on {stats['voices']} voices, {stats['stolen']} stolen, "
+                  f"{stats['rate_limited']} rate-limited, {stats['dropped']} dropped")
             pygame.mixer.stop()
         
         pygame.quit()
         sys.exit()
+    
+    def run_headless(self, frames=HEADLESS_DEFAULT_FRAMES, pilot=bot_pilot, stop_on_game_over=True, render=False):
+        """Drive the simulation as fast as possible and return run statistics"""
+        start_time = time.perf_counter()
+        frame = 0
+        survival_frames = None
+        peak_counts = {}
+        while frame < frames:
+            if self.game_over:
+                if survival_frames is None:
+                    survival_frames = frame
+                if stop_on_game_over:
+                    break
+                self.restart_game()
+            self.profiler.begin_frame()
+            if pilot:
+                pilot(self)
+            self.profiler.lap('events')
+            self.tick()
+            if render:
+                self.draw()
+            counts = self.entity_counts()
+            self.profiler.end_frame(counts)
+            for kind, count in counts.items():
+                if count > peak_counts.get(kind, 0):
+                    peak_counts[kind] = count
+            frame += 1
+        elapsed = time.perf_counter() - start_time
+        self.profiler.close()
+        if self.recorder:
+            self.recorder.close()
+        
+        return {
+            'seed': self.seed,
+            'frames': frame,
+            'elapsed': elapsed,
+            'fps': frame / elapsed if elapsed > 0 else float('inf'),
+            'game_time': frame / FPS,
+            'score': self.score,
+            'level': self.get_current_level(),
+            'game_over': self.game_over,
+            'survival_time': (frame if survival_frames is None else survival_frames) / FPS,
+            'peak_counts': peak_counts,
+            'render': self.renderer.stats() if render else None,
+            'profile': self.profiler.percentiles(),
+        }
 
-def main():
-    """Main function to start the game"""
+    def run_replay(self, replay, render=False):
+        """Re-simulate a recorded session as fast as possible and check it reproduces the recorded trajectory"""
+        trajectory = []
+        last_point = (self.score, self.level)
+        divergence = None
+        start_time = time.perf_counter()
+        for tick, (held, actions) in enumerate(replay, 1):
+            self.profiler.begin_frame()
+            for action in actions:
+                if action == REPLAY_ACTION_FIRE:
+                    self.fire_bullet()
+                elif action == REPLAY_ACTION_RESTART:
+                    self.restart_game()
+            self.held_keys = held
+            self.profiler.lap('events')
+            self.update()
+            if render:
+                self.draw()
+            self.profiler.end_frame(self.entity_counts())
+            
+            if (self.score, self.level) != last_point:
+                last_point = (self.score, self.level)
+                expected = replay.trajectory[len(trajectory)] if len(trajectory) < len(replay.trajectory) else None
+                trajectory.append((tick, self.score, self.level))
+                if divergence is None and trajectory[-1] != expected:
+                    divergence = tick
+        elapsed = time.perf_counter() - start_time
+        self.profiler.close()
+        
+        if divergence is None and len(trajectory) < len(replay.trajectory):
+            # The recording scored points the replay never reached
+            divergence = replay.trajectory[len(trajectory)][0]
+        return {
+            'seed': self.seed,
+            'frames': replay.ticks,
+            'elapsed': elapsed,
+            'fps': replay.ticks / elapsed if elapsed > 0 else float('inf'),
+            'game_time': replay.ticks / FPS,
+            'score': self.score,
+            'level': self.get_current_level(),
+            'game_over': self.game_over,
+            'matches': divergence is None,
+            'divergence_tick': divergence,
+            'render': self.renderer.stats() if render else None,
+            'profile': self.profiler.percentiles(),
+        }
+
+def init_worker():
+    """Set up a batch worker process: headless subsystems only, per-game prints (level ups and the like) silenced"""
+    sys.stdout = open(os.devnull, 'w')
+    startup(headless=True)
+
+def simulate_session(seed, frames, pilot_name, levels_path=LEVELS_PATH, swarm=False):
+    """Play one seeded headless game to game over (or the frame limit) and return its summary"""
+    game = Game(headless=True, seed=seed, levels=LevelTable(levels_path), swarm=swarm)
+    stats = game.run_headless(frames=frames, pilot=PILOTS[pilot_name])
+    return {
+        'seed': seed,
+        'score': stats['score'],
+        'level': stats['level'],
+        'survival_time': stats['survival_time'],
+        'game_over': stats['game_over'],
+        'peak_counts': stats['peak_counts'],
+    }
+
+def summarize_batch(results):
+    """Aggregate batch results: survival time and score distributions, levels reached and peak entity counts"""
+    survival = np.array([result['survival_time'] for result in results])
+    scores = np.array([result['score'] for result in results])
+    levels = np.bincount([result['level'] for result in results])[1:]
+    peaks = {}
+    for result in results:
+        for kind, count in result['peak_counts'].items():
+            peaks.setdefault(kind, []).append(count)
+    return {
+        'games': len(results),
+        'survival_time': dict(zip(('p10', 'p50', 'p90'), np.percentile(survival, (10, 50, 90)).tolist()),
+                              mean=float(survival.mean())),
+        'score': dict(zip(('p10', 'p50', 'p90'), np.percentile(scores, (10, 50, 90)).tolist()),
+                      mean=float(scores.mean()), std=float(scores.std()), max=int(scores.max())),
+        'levels_reached': {level: int(count) for level, count in enumerate(levels, 1) if count},
+        'peak_counts': {kind: {'mean': float(np.mean(counts)), 'max': int(max(counts))} for kind, counts in peaks.items()},
+    }
+
+def run_batch_cli(args):
+    """Spread seeded headless games across worker processes, streaming results as they finish"""
+    first_seed = args.seed or 0
+    seeds = range(first_seed, first_seed + args.batch)
+    workers = args.workers or os.cpu_count()
+    results = []
+    out = open(args.batch_out, 'w') if args.batch_out else None
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(simulate_session, seed, args.frames, args.pilot, args.levels,
+                                   args.swarm) for seed in seeds]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+            if len(results) % max(1, args.batch // 20) == 0 or len(results) == args.batch:
+                print(f"{len(results)}/{args.batch} games done")
+    elapsed = time.perf_counter() - start_time
+    if out:
+        out.close()
+    
+    summary = summarize_batch(results)
+    survival = summary['survival_time']
+    score = summary['score']
+    print(f"{args.batch} games ({args.pilot} pilot) on {workers} workers in {elapsed:.1f}s - "
+          f"{args.batch / elapsed:.1f} games/sec")
+    print(f"Survival time: mean {survival['mean']:.1f}s | p10 {survival['p10']:.1f}s | "
+          f"p50 {survival['p50']:.1f}s | p90 {survival['p90']:.1f}s")
+    print(f"Score: mean {score['mean']:.0f} ± {score['std']:.0f} | p10 {score['p10']:.0f} | "
+          f"p50 {score['p50']:.0f} | p90 {score['p90']:.0f} | max {score['max']}")
+    print("Levels reached: " + ", ".join(f"L{level}: {count}" for level, count in summary['levels_reached'].items()))
+    print("Peak entities: " + ", ".join(f"{kind} {peak['mean']:.0f} avg / {peak['max']} max"
+                                        for kind, peak in summary['peak_counts'].items()))
+    return summary
+
+def run_headless_cli(args):
+    """Run a headless simulation (or replay) from the command line and print a report"""
+    levels = LevelTable(args.levels)
+    if args.replay:
+        replay = Replay(args.replay)
+        if replay.levels_digest != levels.digest:
+            sys.exit(f"{args.replay} was recorded with a different levels file than {args.levels}; "
+                     f"replay it with the same --levels FILE")
+        # The recorded enemy AI mode is used whatever --swarm says
+        game = Game(headless=True, seed=replay.seed, dirty_rects=not args.full_redraw, profile_path=args.profile_out,
+                    levels=levels, swarm=replay.swarm)
+        stats = game.run_replay(replay, render=args.render)
+    else:
+        game = Game(headless=True, seed=args.seed, dirty_rects=not args.full_redraw, profile_path=args.profile_out,
+                    record_path=args.record, levels=levels, swarm=args.swarm)
+        stats = game.run_headless(frames=args.frames, pilot=PILOTS[args.pilot], stop_on_game_over=not args.endless,
+                                  render=args.render)
+    print(f"Simulated {stats['frames']} frames ({stats['game_time']:.1f}s of game time) "
+          f"in {stats['elapsed']:.2f}s - {stats['fps']:.0f} frames/sec")
+    print(f"Seed: {stats['seed']} | Score: {stats['score']} | Level: {stats['level']} | "
+          f"Game over: {stats['game_over']}")
+    if args.replay:
+        if stats['matches']:
+            print(f"Replay matches the recorded score and level trajectory ({len(replay.trajectory)} changes)")
+        else:
+            print(f"Replay DIVERGED from the recording at tick {stats['divergence_tick']}")
+    if stats['render']:
+        print(f"Rendering: {stats['render']['pixels_per_frame']:.0f} pixels pushed per frame "
+              f"({stats['render']['screen_fraction']:.1%} of the screen), "
+              f"{stats['render']['full_frames']} full flips")
+    for name, store in game.store_stats().items():
+        print(f"Store {name}: high water {store['high_water']}, capacity {store['capacity']}")
+    if args.profile:
+        print(f"{'phase (last ' + str(PROFILER_HISTORY) + ' frames)':<32} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} ms")
+        for name, phase in sorted(stats['profile'].items()):
+            print(f"{name:<32} {phase['p50']:7.3f} {phase['p95']:7.3f} {phase['p99']:7.3f} {phase['max']:7.3f}")
+    return stats
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Space Shooter - Enhanced Edition")
+    parser.add_argument('--headless', action='store_true',
+                        help="run the simulation without a window or audio, as fast as possible")
+    parser.add_argument('--frames', type=int, default=HEADLESS_DEFAULT_FRAMES,
+                        help="number of frames to simulate in headless mode")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="random seed for a deterministic session")
+    parser.add_argument('--endless', action='store_true',
+                        help="restart after game over instead of stopping (headless mode)")
+    parser.add_argument('--render', action='store_true',
+                        help="also run Game.draw to an off-screen surface (headless mode)")
+    parser.add_argument('--full-redraw', action='store_true',
+                        help="clear and flip the whole screen every frame instead of dirty rectangles")
+    parser.add_argument('--profile', action='store_true',
+                        help="print per-phase frame timing percentiles after a headless run")
+    parser.add_argument('--profile-out', metavar='FILE', default=None,
+                        help="write per-frame phase timings and entity counts to FILE as JSON lines")
+    parser.add_argument('--batch', type=int, metavar='GAMES', default=None,
+                        help="play GAMES seeded headless games (seeds start at --seed) across worker processes")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for --batch (default: one per CPU)")
+    parser.add_argument('--pilot', choices=sorted(PILOTS), default='bot',
+                        help="scripted pilot for headless and batch games")
+    parser.add_argument('--batch-out', metavar='FILE', default=None,
+                        help="write each batch game's result to FILE as JSON lines")
+    parser.add_argument('--banner', action='store_true',
+                        help="print the full controls and feature overview before starting")
+    parser.add_argument('--record', metavar='FILE', default=None,
+                        help="record the session's seed and per-tick input to FILE for replaying")
+    parser.add_argument('--replay', metavar='FILE', default=None,
+                        help="re-simulate a recorded session headlessly and check the score and level match")
+    parser.add_argument('--levels', metavar='FILE', default=LEVELS_PATH,
+                        help="wave definitions to build the per-level difficulty tables from")
+    parser.add_argument('--swarm', action='store_true',
+                        help="enemy ships fly in flocking squad formations and lead their shots "
+                             "(replays use the recorded mode)")
+    return parser.parse_args(argv)
+
+def print_banner(levels):
+    """Print the controls and feature overview"""
     print("=" * 60)
     print("🚀 SPACE SHOOTER - ENHANCED EDITION WITH LEVELS 🚀")
     print("=" * 60)
     print("Controls:")
     print("- Left/Right Arrow Keys: Move spaceship")
-    print("- Spacebar: Shoot bullets")
+    print("- Spacebar or S: Shoot bullets (hold to keep firing)")
     print("- M: Toggle background music on/off")
     print("- R: Restart game (when game over)")
+    print("- F3: Toggle frame-time profiler overlay")
     print("- Close window: Quit game")
     print("\nFeatures:")
     print("✨ Background music (procedurally generated)")
@@ -1001,16 +3106,39 @@ def main():
     print("🎵 Music toggle functionality")
     print("📈 Progressive level system")
     print("\nLevel System:")
-    print(f"- Advance 1 level every {POINTS_PER_LEVEL} points")
+    print(f"- Advance a level as your score grows ({levels.next_threshold(1)} points for level 2)")
     print("- Higher levels = faster asteroids + more frequent spawning")
     print("- Higher level asteroids give more points")
     print("- Visual indicators show asteroid difficulty")
-    print(f"- Maximum level: {MAX_LEVEL}")
+    print(f"- Maximum level: {levels.max_level}")
     print("\nObjective: Destroy asteroids to increase your score!")
     print("Survive as long as possible as difficulty increases!")
     print("=" * 60)
+
+def main():
+    """Main function to start the game"""
+    timer = StartupTimer()
+    timer.lap('import')
+    args = parse_args()
+    if args.batch:
+        run_batch_cli(args)
+        return
+    if args.headless or args.replay:
+        startup(headless=True)
+        stats = run_headless_cli(args)
+        if args.replay and not stats['matches']:
+            sys.exit(1)
+        return
+    
+    levels = LevelTable(args.levels)
+    if args.banner:
+        print_banner(levels)
+    else:
+        print("Arrows/A/D: move | Space: shoot | M: music | R: restart | F3: profiler (--banner for more)")
     
-    game = Game()
+    startup(timer=timer)
+    game = Game(seed=args.seed, dirty_rects=not args.full_redraw, profile_path=args.profile_out, record_path=args.record,
+                startup_timer=timer, levels=levels, swarm=args.swarm)
     game.run()
 
 if __name__ == "__main__":